@@ -1,4 +1,5 @@
 import asyncio
+import signal
 
 from aiogram import Bot, Dispatcher, F
 from aiogram.filters.command import Command
@@ -8,16 +9,24 @@ from aiogram.types import (
     Message,
 )
 
-from bot.classes import UserClass
+from bot.bin.supervisor import Supervisor
+from bot.classes import Parser, UserClass, notifier
 from bot.config import config
 from bot.filters import IsAdmin
 from bot.handlers import *
-from bot.middlewares import LogMiddleware, TokenMiddleware, UserMiddleware
-from bot.until import logger, main_button
-from database import DataBaseCrud
+from bot.middlewares import (
+    LogMiddleware,
+    MetricsMiddleware,
+    TokenMiddleware,
+    TraceMiddleware,
+    UserMiddleware,
+)
+from bot.services import homework_watcher, metrics_server, prefetcher, sweeper, webhook_server
+from bot.until import logger, main_button, tracer
+from database import DataBaseCrud, fsm_storage
 
 bot = Bot(config.TOKEN)
-dp = Dispatcher()
+dp = Dispatcher(storage=fsm_storage)
 
 
 # START!
@@ -33,8 +42,8 @@ async def start(message: Message, user: UserClass):
         )
 
 
-async def main():
-    db = DataBaseCrud()
+def setup_dispatcher():
+    """Includes the routers and sets up the middlewares of the dispatcher."""
     dp.include_routers(
         debug_router,
         auth_router,
@@ -44,12 +53,48 @@ async def main():
         unknown_router,
     )
 
+    dp.update.outer_middleware(TraceMiddleware())
     dp.message.outer_middleware(UserMiddleware())
     debug_router.message.filter(IsAdmin())
     dp.message.middleware(LogMiddleware())
+    dp.message.middleware(MetricsMiddleware())
+    dp.message.middleware(TraceMiddleware())
 
     data_get_router.message.middleware(TokenMiddleware())
 
+
+async def wait_for_stop():
+    """Waits until the process is asked to stop by SIGINT or SIGTERM."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows, Ctrl+C cancels the main task instead
+            pass
+    await stop.wait()
+
+
+async def run_webhook(feeder: Dispatcher | Supervisor):
+    """Receives the updates by the webhook until the process is stopped.
+
+    Args:
+        feeder (Dispatcher | Supervisor): Handles the updates or routes them to the workers.
+    """
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    await webhook_server.start(bot, feeder)
+    try:
+        await wait_for_stop()
+    finally:
+        await webhook_server.stop()
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
+
+
+async def main():
+    db = DataBaseCrud()
+    setup_dispatcher()
+
     await bot.set_my_commands(
         [
             BotCommand(command='start', description='Начало работы'),
@@ -60,12 +105,45 @@ async def main():
         ]
     )
 
-    await bot.delete_webhook(drop_pending_updates=True)
     await db.create_tables()
     logger.info('Bot restart!')
+    # The updates are handled by worker processes if there are several
+    supervisor = Supervisor() if config.WORKERS > 1 else None
+    if supervisor is not None:
+        # The workers notify, prefetch and watch the homework of their users themselves
+        supervisor.start(dp)
+    else:
+        notifier.start(bot)
+        prefetcher.start()
+        homework_watcher.start()
+    sweeper.start()
+    await metrics_server.start()
     try:
-        await dp.start_polling(bot)
+        if config.BOT_MODE == 'webhook':
+            await run_webhook(supervisor or dp)
+        elif supervisor is not None:
+            await bot.delete_webhook(drop_pending_updates=True)
+            polling = asyncio.create_task(supervisor.poll(bot))
+            try:
+                await wait_for_stop()
+            finally:
+                polling.cancel()
+                await asyncio.gather(polling, return_exceptions=True)
+        else:
+            await bot.delete_webhook(drop_pending_updates=True)
+            await dp.start_polling(bot)
     finally:
+        if supervisor is not None:
+            await supervisor.stop()
+        await metrics_server.stop()
+        await sweeper.stop()
+        await homework_watcher.stop()
+        await prefetcher.stop()
+        await notifier.stop()
+        await fsm_storage.close()
+        await db.close()
+        await Parser.close_session()
+        tracer.close()
         await bot.close()
 
 
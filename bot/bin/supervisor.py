@@ -0,0 +1,253 @@
+"""Supervisor mode, the updates are handled by several worker processes.
+
+The supervisor receives the updates (by long polling or by the webhook) and routes every update to
+a worker by the ID of its user. So all updates of a user are handled by the same worker one by one
+in the order they came, and the FSM state of the user lives in that worker. The workers share the
+SQLite database, it's in WAL mode with a busy timeout, so one writer doesn't block the readers and
+concurrent writers wait for each other instead of failing.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import signal
+from contextlib import asynccontextmanager
+from multiprocessing.context import SpawnProcess
+from queue import Full
+from typing import AsyncIterator, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+
+from bot.config import config
+from bot.until import logger
+
+# Forking a process with a running event loop isn't safe
+_context = multiprocessing.get_context('spawn')
+
+
+def shard_key(update: Update) -> int:
+    """Returns the ID the update is routed by: its user, its chat or 0 if it has neither."""
+    context = UserContextMiddleware.resolve_event_context(update)
+    if context.user is not None:
+        return context.user.id
+    if context.chat is not None:
+        return context.chat.id
+    return 0
+
+
+def _worker_path(path: str, index: int) -> str:
+    root, ext = os.path.splitext(path)
+    return f'{root}.worker{index}{ext}'
+
+
+class Supervisor:
+    """Starts the worker processes and routes the updates to them.
+
+    It has `feed_update` like `Dispatcher`, so the webhook server feeds it the same way.
+    """
+
+    def __init__(
+        self,
+        workers: int = config.WORKERS,
+        queue_size: int = config.WORKER_QUEUE_SIZE,
+        shutdown_timeout: float = config.WORKER_SHUTDOWN_TIMEOUT,
+    ):
+        """Initializes the supervisor.
+
+        Args:
+            workers (int): Number of the worker processes.
+            queue_size (int): Maximum number of the updates waiting for a worker.
+            shutdown_timeout (float): Seconds a worker is given to finish its updates on stop.
+        """
+        self.workers = workers
+        self.shutdown_timeout = shutdown_timeout
+
+        self._queues = [_context.Queue(queue_size) for _ in range(workers)]
+        self._processes: list[Optional[SpawnProcess]] = [None] * workers
+        self._watchdog: Optional[asyncio.Task] = None
+        self._update_types: list[str] = []
+
+        self.routed = [0] * workers
+        self.restarts = 0
+
+    def start(self, dp: Dispatcher):
+        """Starts the workers, `dp` is set up the same way as the dispatchers of the workers."""
+        self._update_types = dp.resolve_used_update_types()
+        for index in range(self.workers):
+            self._spawn(index)
+        self._watchdog = asyncio.create_task(self._watch())
+        logger.info(f'{self.workers} workers have been started')
+
+    def _spawn(self, index: int):
+        # A worker reads its settings on import, the environment is inherited by the new process
+        overrides = {
+            'LOG_FILE': _worker_path(config.LOG_FILE, index),
+            'TRACE_FILE': _worker_path(config.TRACE_FILE, index),
+            'METRICS_PORT': str(config.METRICS_PORT + 1 + index if config.METRICS_PORT else 0),
+        }
+        saved = {key: os.environ.get(key) for key in overrides}
+        os.environ.update(overrides)
+        try:
+            process = _context.Process(
+                target=run_worker,
+                args=(index, self.workers, self._queues[index]),
+                name=f'bot-worker-{index}',
+                daemon=True,
+            )
+            process.start()
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key)
+                else:
+                    os.environ[key] = value
+        self._processes[index] = process
+
+    async def _watch(self):
+        """Restarts the workers which have died, their queued updates are kept."""
+        while True:
+            await asyncio.sleep(5)
+            for index, process in enumerate(self._processes):
+                if process is not None and not process.is_alive():
+                    logger.error(f'Worker {index} has exited with code {process.exitcode}!')
+                    self.restarts += 1
+                    self._spawn(index)
+
+    def resolve_used_update_types(self) -> list[str]:
+        return self._update_types
+
+    async def feed_update(self, bot: Bot, update: Update):
+        """Routes the update to the worker of its user, waits while the worker is behind."""
+        key = shard_key(update)
+        index = key % self.workers
+        item = (key, update.model_dump_json(exclude_unset=True, by_alias=True))
+        queue = self._queues[index]
+        try:
+            queue.put_nowait(item)
+        except Full:
+            await asyncio.to_thread(queue.put, item)
+        self.routed[index] += 1
+
+    async def poll(self, bot: Bot, timeout: int = 30):
+        """Receives the updates by long polling and routes them until it's cancelled."""
+        offset = None
+        while True:
+            try:
+                updates = await bot.get_updates(
+                    offset=offset,
+                    timeout=timeout,
+                    allowed_updates=self._update_types,
+                    request_timeout=int(bot.session.timeout + timeout),
+                )
+            except Exception as e:
+                logger.error(f'Getting updates has failed: {e!r}')
+                await asyncio.sleep(5)
+                continue
+            for update in updates:
+                await self.feed_update(bot, update)
+                offset = update.update_id + 1
+
+    async def stop(self):
+        """Lets the workers finish the queued updates and stops them."""
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            await asyncio.gather(self._watchdog, return_exceptions=True)
+            self._watchdog = None
+
+        for queue in self._queues:
+            await asyncio.to_thread(queue.put, None)
+        for index, process in enumerate(self._processes):
+            if process is None:
+                continue
+            await asyncio.to_thread(process.join, self.shutdown_timeout)
+            if process.is_alive():
+                logger.warning(f"Worker {index} hasn't stopped in time, it's terminated")
+                process.terminate()
+            self._processes[index] = None
+
+
+class UserLocks:
+    """Locks by user ID, so the updates of a user are handled one at a time in their order."""
+
+    def __init__(self):
+        # Lock and the number of its holders and waiters
+        self._locks: dict[int, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, key: int) -> AsyncIterator[None]:
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+
+def run_worker(index: int, workers: int, queue: multiprocessing.Queue):
+    """Entry point of a worker process."""
+    # Ctrl+C reaches the whole process group, the worker is stopped by the supervisor instead
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_work(index, workers, queue))
+
+
+async def _work(index: int, workers: int, queue: multiprocessing.Queue):
+    # Imported here, the module of the bot imports this one
+    from bot.bin.bot import bot, dp, setup_dispatcher
+    from bot.classes import Parser, notifier
+    from bot.services import homework_watcher, metrics_server, prefetcher
+    from bot.until import tracer
+    from database import DataBaseCrud, fsm_storage
+
+    setup_dispatcher()
+    db = DataBaseCrud()
+    # The rate limit of Telegram is shared by all workers
+    notifier.queue.rate = config.NOTIFY_GLOBAL_RATE / workers
+    notifier.start(bot)
+    # Every worker refreshes and checks the users whose updates are routed to it
+    prefetcher.shard = homework_watcher.shard = (index, workers)
+    prefetcher.start()
+    homework_watcher.start()
+    await metrics_server.start()
+
+    locks = UserLocks()
+    slots = asyncio.Semaphore(config.WORKER_CONCURRENCY)
+    tasks: set[asyncio.Task] = set()
+
+    async def handle(key: int, update: Update):
+        try:
+            async with locks.hold(key):
+                await dp.feed_update(bot, update)
+        except Exception as e:
+            logger.error(f'Handling the update {update.update_id} has failed: {e!r}')
+        finally:
+            slots.release()
+
+    logger.info(f'Worker {index} has started')
+    try:
+        while (item := await asyncio.to_thread(queue.get)) is not None:
+            key, data = item
+            update = Update.model_validate_json(data, context={'bot': bot})
+            await slots.acquire()
+            task = asyncio.create_task(handle(key, update))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+    finally:
+        await metrics_server.stop()
+        await homework_watcher.stop()
+        await prefetcher.stop()
+        await notifier.stop()
+        await fsm_storage.close()
+        await db.close()
+        await Parser.close_session()
+        tracer.close()
+        await bot.session.close()
+        logger.info(f'Worker {index} has stopped')
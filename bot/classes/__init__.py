@@ -2,13 +2,29 @@ __all__ = (
     'HomeworkWeek',
     'Lesson',
     'LinkInfo',
+    'Mark',
+    'MarksWeek',
+    'Notifier',
+    'SendQueue',
     'StudyDay',
+    'StudyWeek',
     'Parser',
+    'Renderer',
+    'ResponseCache',
+    'ScheduleWeek',
     'SerializationMixin',
     'UserClass',
+    'notifier',
+    'renderer',
 )
 
 from .homework import HomeworkWeek, Lesson, LinkInfo, StudyDay
+from .marks import Mark, MarksWeek
+from .notifier import Notifier, SendQueue, notifier
 from .parser import Parser
+from .renderer import Renderer, renderer
+from .response_cache import ResponseCache
+from .schedule import ScheduleWeek
 from .serialization_mixin import SerializationMixin
+from .study_week import StudyWeek
 from .user_class import UserClass
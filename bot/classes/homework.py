@@ -1,30 +1,34 @@
+import json
 import re
 from collections import namedtuple
-from datetime import datetime, timedelta
-from typing import Iterator, Optional
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from hashlib import sha256
+from typing import ClassVar, Iterator, Optional, Self
 
-from pydantic import BaseModel, Field
-
-from bot.until import get_weekday
+from bot.config import config
+from bot.until import TTLCache, get_weekday
 from database import HomeworkWeekModel, LessonModel, StudyDayModel
 
-from .serialization_mixin import SerializationMixin
+from .payloads import MaterialItem, homework_decoder, parse_date
 
 LinkInfo = namedtuple('LinkInfo', ['name', 'link'])
 
 
-class Lesson(BaseModel, SerializationMixin):
+@dataclass(slots=True)
+class Lesson:
     name: str
-    homework: str = Field(frozen=True)
-    links: list[LinkInfo] = Field(examples=[LinkInfo('name', 'link')])
-    model: type = LessonModel
+    homework: str
+    links: list[LinkInfo] = field(default_factory=list)
+    model: ClassVar[type] = LessonModel
 
 
-class StudyDay(BaseModel, SerializationMixin):
+@dataclass(slots=True)
+class StudyDay:
     name: str
-    date: datetime = Field(frozen=True)
-    lessons: list[Lesson]
-    model: type = StudyDayModel
+    date: datetime
+    lessons: list[Lesson] = field(default_factory=list)
+    model: ClassVar[type] = StudyDayModel
 
     def __iter__(self) -> Iterator[Lesson]:
         return iter(self.lessons)
@@ -33,24 +37,46 @@ class StudyDay(BaseModel, SerializationMixin):
         return len(self.lessons)
 
 
-class HomeworkWeek(SerializationMixin):
+class HomeworkWeek:
+    """Homework of a week divided by study days.
+
+    Many weeks are kept in memory, so the week, its days and lessons are slotted objects.
+    """
+
+    __slots__ = (
+        'id_',
+        '_begin',
+        '_end',
+        'date',
+        'timestamp',
+        '_content_hash',
+        'stale',
+        '__days',
+    )
+
     model = HomeworkWeekModel
+    # Weeks rebuilt from the database by their ID and content hash
+    built: ClassVar[TTLCache] = TTLCache(config.CACHE_MAX_ENTRIES)
 
     def __init__(
         self,
         id_: int,
         begin: datetime,
         end: datetime,
-        response: Optional[dict] = None,
+        response: Optional[bytes] = None,
         days: Optional[list[StudyDay]] = None,
+        timestamp: Optional[datetime] = None,
         **kwargs,
     ):
-        super().__init__()
         # Date
         self.id_: int = id_
         self._begin: datetime = begin
         self._end: datetime = end
         self.date: tuple[datetime, datetime] = begin, end
+        self.timestamp: datetime = timestamp or datetime.now()
+        self._content_hash: Optional[str] = None
+        # Built from an outdated response while "Моя школа" is unavailable
+        self.stale: bool = False
 
         # Data
         self.__days: list[StudyDay]
@@ -80,43 +106,124 @@ class HomeworkWeek(SerializationMixin):
     def days(self) -> list[StudyDay]:
         return self.__days
 
-    def __get_ready_homework(self, raw_response: dict) -> list[StudyDay]:
+    @property
+    def content_hash(self) -> str:
+        """Hash of the week content, equal for every student who got the same homework."""
+        if self._content_hash is not None:
+            return self._content_hash
+        normalized = [
+            self.begin.date().isoformat(),
+            self.end.date().isoformat(),
+            [
+                [day.name, [[lesson.name, lesson.homework, lesson.links] for lesson in day]]
+                for day in self.__days
+            ],
+        ]
+        self._content_hash = sha256(json.dumps(normalized, ensure_ascii=False).encode()).hexdigest()
+        return self._content_hash
+
+    def to_model(self) -> HomeworkWeekModel:
+        return HomeworkWeekModel(
+            begin=self.begin.date(),
+            end=self.end.date(),
+            timestamp=self.timestamp,
+            expires_at=self.timestamp + timedelta(seconds=config.HOMEWORK_RETENTION),
+            content_hash=self.content_hash,
+            study_days=[
+                StudyDayModel(
+                    name=day.name,
+                    date=day.date.date(),
+                    lessons=[
+                        LessonModel(
+                            name=lesson.name,
+                            homework=lesson.homework,
+                            links=json.dumps(lesson.links, ensure_ascii=False),
+                        )
+                        for lesson in day
+                    ],
+                )
+                for day in self.__days
+            ],
+        )
+
+    @classmethod
+    def from_model(cls, model: Optional[HomeworkWeekModel]) -> None | Self:
+        """Makes the week from the model, its `study_days` and their `lessons` must be loaded.
+
+        The content of a stored week never changes, so the weeks are rebuilt once and shared.
+        """
+        if model is None:
+            return None
+        if (week := cls.built.get((model.id, model.content_hash))) is not None:
+            week.timestamp = model.timestamp
+            return week
+        week = cls(
+            model.id,
+            datetime.combine(model.begin, time()),
+            datetime.combine(model.end, time()),
+            days=[
+                StudyDay(
+                    name=day.name,
+                    date=datetime.combine(day.date, time()),
+                    lessons=[
+                        Lesson(
+                            name=lesson.name,
+                            homework=lesson.homework or '',
+                            links=[LinkInfo(*link) for link in json.loads(lesson.links or '[]')],
+                        )
+                        for lesson in day.lessons
+                    ],
+                )
+                for day in model.study_days
+            ],
+            timestamp=model.timestamp,
+        )
+        week._content_hash = model.content_hash
+        cls.built.set((model.id, model.content_hash), week)
+        return week
+
+    def diff(self, old: 'HomeworkWeek') -> list[tuple[StudyDay, list[Lesson]]]:
+        """Returns the lessons which are new or changed since the old version of this week.
+
+        Returns:
+            Days with their new or changed lessons, days without changes are skipped.
+        """
+        changes = []
+        for day, old_day in zip(self.__days, old.days):
+            if new_lessons := [lesson for lesson in day if lesson not in old_day.lessons]:
+                changes.append((day, new_lessons))
+        return changes
+
+    def __get_ready_homework(self, raw: bytes) -> list[StudyDay]:
         """Collect ready homework data from raw response."""
         days = [
-            StudyDay(name=day, date=datetime.now() + timedelta(days=i), lessons=[])
+            StudyDay(name=day, date=self._begin + timedelta(days=i), lessons=[])
             for i, day in enumerate(get_weekday()[:5])
         ]
 
-        for lesson in raw_response['payload']:
-            date = datetime.strptime(lesson['date'], '%Y-%m-%d')
-            if add_materials := lesson.get('additional_materials'):
-                links = [
-                    self.__process_material_item(item)
-                    for mat in add_materials
-                    for item in mat.get('items')
-                ]
-            else:
-                links = []
-            if lesson['homework'].lower() not in [None, '.', 'не задано'] or links:
-                days[date.weekday()].lessons.append(
-                    Lesson(
-                        name=lesson.get('subject_name'),
-                        homework=lesson.get('homework').strip(),
-                        links=links,
-                    )
+        for lesson in homework_decoder.decode(raw).payload:
+            links = [
+                self.__process_material_item(item)
+                for mat in lesson.additional_materials or ()
+                for item in mat.items
+            ]
+            homework = lesson.homework or ''
+            if homework.lower() not in ['.', 'не задано'] or links:
+                days[parse_date(lesson.date).weekday()].lessons.append(
+                    Lesson(name=lesson.subject_name, homework=homework.strip(), links=links)
                 )
 
         return days
 
     @staticmethod
-    def __process_material_item(item: dict) -> LinkInfo:
+    def __process_material_item(item: MaterialItem) -> LinkInfo:
         """Processes the individual material and returns the reference information.
 
         Returns:
             A dictionary which contains links for each lesson
         """
         # FIXME: links doesn't work
-        if re.search(r'\.(?:png|jpg|docx|pptx)$', item.get('title', ''), re.MULTILINE):
-            return LinkInfo(item.get('title'), item.get('link'))
+        if re.search(r'\.(?:png|jpg|docx|pptx)$', item.title, re.MULTILINE):
+            return LinkInfo(item.title, item.link)
         else:
-            return LinkInfo(item.get('title'), item['urls'][2]['url'])
+            return LinkInfo(item.title, item.urls[2].url)
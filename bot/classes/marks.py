@@ -0,0 +1,26 @@
+from collections import namedtuple
+from datetime import datetime
+
+from .payloads import marks_decoder, parse_date
+from .study_week import StudyWeek
+
+Mark = namedtuple('Mark', ['subject', 'value'])
+
+
+class MarksWeek(StudyWeek):
+    """Marks of a week divided by days."""
+
+    __slots__ = ('empty',)
+
+    def __init__(self, begin: datetime, end: datetime, response: bytes):
+        self.empty = True
+        super().__init__(begin, end, response)
+
+    def _fill(self, response: bytes):
+        payload = marks_decoder.decode(response).payload
+        if not payload:
+            return
+        self.empty = False
+        for mark in payload:
+            if (weekday := parse_date(mark.date).weekday()) < len(self._days):
+                self._days[weekday].append(Mark(mark.subject_name, mark.value))
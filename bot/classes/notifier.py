@@ -0,0 +1,129 @@
+import asyncio
+from math import inf
+from time import monotonic
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+
+from bot.config import config
+from bot.until import BackgroundTask, TTLCache, logger
+from database import DataBaseCrud
+
+from .homework import Lesson, StudyDay
+
+db = DataBaseCrud()
+
+
+class SendQueue:
+    """Bounded queue of messages sent within the Telegram limits.
+
+    Messages are sent one by one, not faster than `rate` messages per second in total and not more
+    often than once per `chat_interval` seconds to the same chat.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = config.NOTIFY_QUEUE_SIZE,
+        rate: float = config.NOTIFY_GLOBAL_RATE,
+        chat_interval: float = config.NOTIFY_CHAT_INTERVAL,
+    ):
+        self.rate = rate
+        self.chat_interval = chat_interval
+
+        self._queue: asyncio.Queue[tuple[int, str]] = asyncio.Queue(maxsize)
+        # Chats which were sent a message less than `chat_interval` seconds ago
+        self._last_sent = TTLCache(maxsize, chat_interval)
+        self._next_send = 0.0
+        self._task = BackgroundTask()
+
+        self.sent = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def put(self, chat_id: int, text: str) -> bool:
+        """Adds a message to the queue, the message is dropped if the queue is full."""
+        try:
+            self._queue.put_nowait((chat_id, text))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f'The send queue is full, the message to {chat_id} is dropped!')
+            return False
+
+    def start(self, bot: Bot):
+        self._task.start(self._run, bot)
+
+    async def stop(self):
+        await self._task.stop()
+
+    async def _run(self, bot: Bot):
+        while True:
+            chat_id, text = await self._queue.get()
+            try:
+                await self._send(bot, chat_id, text)
+            except Exception as e:
+                logger.error(f'Message to {chat_id} has not been sent: {e!r}')
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, bot: Bot, chat_id: int, text: str):
+        now = monotonic()
+        chat_ready_at = self._last_sent.get(chat_id, -inf, count=False) + self.chat_interval
+        await asyncio.sleep(max(self._next_send, chat_ready_at) - now)
+        try:
+            await bot.send_message(chat_id, text, parse_mode='Markdown')
+        except TelegramRetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            await bot.send_message(chat_id, text, parse_mode='Markdown')
+        except TelegramForbiddenError:
+            logger.debug(f'The bot is blocked by {chat_id}, the message is dropped')
+            return
+        finally:
+            self._next_send = monotonic() + 1 / self.rate
+        self._last_sent.set(chat_id, monotonic())
+        self.sent += 1
+
+
+class Notifier:
+    """Pushes new homework to the users who have notifications turned on."""
+
+    def __init__(self, queue: Optional[SendQueue] = None):
+        self.queue = queue or SendQueue()
+
+    def start(self, bot: Bot):
+        self.queue.start(bot)
+
+    async def stop(self):
+        await self.queue.stop()
+
+    async def notify(
+        self,
+        homework_id: int,
+        changes: list[tuple[StudyDay, list[Lesson]]],
+        exclude: Optional[int] = None,
+    ):
+        """Sends the changed lessons to everyone who has the homework week.
+
+        Args:
+            homework_id (int): ID of the stored week.
+            changes (list): Days with their new or changed lessons, see `HomeworkWeek.diff`.
+            exclude (int, optional): ID of the user who shouldn't be notified.
+        """
+        text = self.render(changes)
+        for user in await db.get_homework_subscribers(homework_id):
+            if user.userid != exclude:
+                self.queue.put(user.userid, text)
+
+    @staticmethod
+    def render(changes: list[tuple[StudyDay, list[Lesson]]]) -> str:
+        parts = ['*Новое домашнее задание 🔔*']
+        for day, lessons in changes:
+            parts.append(f'\n*{day.name} ({day.date.strftime("%d.%m")}):*')
+            parts.extend(f'• *{lesson.name}:* _{lesson.homework}_' for lesson in lessons)
+        return '\n'.join(parts)
+
+
+notifier = Notifier()
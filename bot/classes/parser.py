@@ -1,65 +1,112 @@
+import asyncio
+import random
 from datetime import datetime, timedelta
-from functools import wraps
-from typing import Literal, Optional
-
-from requests import HTTPError, get, post
-
-from bot.until import ExpiredTokenError, ServerError, get_weekday, logger
+from typing import Any, Callable, ClassVar, Literal, Optional
+
+import msgspec
+from aiohttp import (
+    ClientConnectionError,
+    ClientResponseError,
+    ClientSession,
+    ClientTimeout,
+    DummyCookieJar,
+    TCPConnector,
+)
+from yarl import URL
+
+from bot.config import config
+from bot.until import (
+    CircuitBreaker,
+    ExpiredTokenError,
+    ServerError,
+    SingleFlight,
+    TTLCache,
+    UnavailableError,
+    logger,
+    metrics,
+    tracer,
+)
 
 from .homework import HomeworkWeek
+from .marks import MarksWeek
+from .payloads import split_by_week
+from .response_cache import Kind, ResponseCache
+from .schedule import ScheduleWeek
 
 
 class Parser:
-    def __init__(self, token: Optional[str] = None, student_id: Optional[int] = None):
+    _session: ClassVar[Optional[ClientSession]] = None
+    cache: ClassVar[ResponseCache] = ResponseCache()
+    flights: ClassVar[SingleFlight] = SingleFlight()
+    # Student and person IDs by token, shared by all parsers
+    identities: ClassVar[TTLCache] = TTLCache(config.IDENTITY_CACHE_SIZE, config.IDENTITY_CACHE_TTL)
+    # Circuit breakers by host, so one host being down doesn't block the others
+    breakers: ClassVar[dict[str, CircuitBreaker]] = {}
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        student_id: Optional[int] = None,
+        person_id: Optional[str] = None,
+    ):
         self.token = token
-        if student_id:
-            self.student_id = student_id
-        elif token:
-            self.student_id = self.get_student_id()
-        else:
-            self.student_id = None
-
-    # TODO Cut to the appropriate class
-    @staticmethod
-    def split_day(response: dict[str, dict], func_name: str) -> dict[str, dict]:
-        """Split the lessons or marks or schedule from response by days.
+        # Can't be requested here (the constructor isn't async), see `_ensure_student_id`
+        self.student_id = student_id
+        self.person_id = person_id
 
-        Args:
-            response (dict[str, dict]): Takes in dict with homework
-            func_name (str): What needs to be split up
+    @classmethod
+    def get_session(cls) -> ClientSession:
+        """Returns the HTTP session shared by all parsers, creates it on the first call.
+
+        All users share one connection pool: connections are kept alive, limited per host and
+        DNS lookups are cached. Cookies aren't stored, so they never leak between users.
         """
-        lessons_dict = {'date': response['date'], 'days': {day: [] for day in get_weekday()[:5]}}
-
-        if func_name == 'schedule':
-            lessons_dict['total_count'] = response['total_count']
-            for lesson in response['response']:
-                date = datetime.fromisoformat(lesson['start_at'])
-                name_of_day = get_weekday(date.isoweekday())
-                lessons_dict['days'][name_of_day].append(lesson)
-
-        elif func_name == 'marks':
-            if response['payload']:
-                for mark in response['payload']:
-                    date = datetime.strptime(mark['date'], '%Y-%m-%d')
-                    name_of_day = get_weekday(date.isoweekday())
-                    lessons_dict['days'][name_of_day].append((mark['subject_name'], mark['value']))
-            else:
-                lessons_dict['days'] = None
-
-        else:
-            raise ValueError('Имя функции неверное!')
-
-        return lessons_dict
-
-    def _request(
+        if cls._session is None or cls._session.closed:
+            cls._session = ClientSession(
+                connector=TCPConnector(
+                    limit=config.HTTP_POOL_LIMIT,
+                    limit_per_host=config.HTTP_POOL_LIMIT_PER_HOST,
+                    ttl_dns_cache=config.HTTP_DNS_CACHE_TTL,
+                    keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT,
+                ),
+                cookie_jar=DummyCookieJar(),
+            )
+        return cls._session
+
+    @classmethod
+    def get_breaker(cls, url: str) -> CircuitBreaker:
+        """Returns the circuit breaker of the host of the URL."""
+        host = URL(url).host
+        if host is None:
+            raise ValueError(f'URL without a host: {url}')
+        if (breaker := cls.breakers.get(host)) is None:
+            breaker = cls.breakers[host] = CircuitBreaker(
+                config.BREAKER_THRESHOLD, config.BREAKER_RESET_TIMEOUT
+            )
+        return breaker
+
+    @classmethod
+    async def close_session(cls):
+        if cls._session is not None and not cls._session.closed:
+            await cls._session.close()
+        cls._session = None
+
+    async def _request(
         self,
         url: str,
         method: Literal['GET', 'POST'] = 'GET',
         headers: dict | None = None,
         params: dict | None = None,
         cookies: dict | None = None,
-    ) -> dict:
-        """Send HTTP request and return JSON response.
+    ) -> bytes:
+        """Send HTTP request and return the raw JSON response.
+
+        Identical requests (same method, URL, parameters and token) made while one of them is
+        still in flight share its response instead of going to the server again.
+
+        A request is limited by the timeout of its endpoint. A GET which has timed out, failed to
+        connect or got a 5xx status is retried after a jittered exponential backoff. While the
+        circuit breaker of the host is open the request fails at once.
 
         Args:
             url: Target URL.
@@ -69,52 +116,79 @@ class Parser:
             cookies: Optional cookies.
 
         Returns:
-            JSON response as a dictionary.
+            JSON response as bytes, it's decoded by the caller.
 
         Raises:
             ServerError: If server returns 400 status code.
             ExpiredToken: If server returns 401 status code.
-            HTTPError: For other HTTP errors.
+            UnavailableError: If the server is down (after the retries) or the breaker is open.
+            ClientResponseError: For other HTTP errors.
         """
+        if method not in ('GET', 'POST'):
+            raise ValueError(f'Unsupported method: {method}')
+
         headers = headers or self._headers
         cookies = cookies or {}
         params = params or {}
 
-        try:
-            response = {'GET': get, 'POST': post}[method](
-                url,
-                headers=headers,
-                params=params,
-                cookies=cookies,
-                json=params if method == 'POST' else None,
-            )
-            response.raise_for_status()
-        except KeyError:
-            raise ValueError(f'Unsupported method: {method}')
-        except HTTPError as e:
-            if e.response.status_code == 400:
-                raise ServerError
-            if e.response.status_code == 401:
-                raise ExpiredTokenError
-            raise
-
-        return response.json()
+        key = (method, url, tuple(sorted(params.items())), self.token)
+        return await self.flights.do(key, lambda: self._send(url, method, headers, params, cookies))
 
-    @staticmethod
-    def request_handler():
-        def wrapper(func):
-            @wraps(func)
-            async def wrapped(message, *args, **kwargs):
+    async def _send(
+        self, url: str, method: str, headers: dict, params: dict, cookies: dict
+    ) -> bytes:
+        endpoint = URL(url).path
+        timeout = ClientTimeout(
+            total=config.UPSTREAM_TIMEOUTS.get(endpoint, config.UPSTREAM_TIMEOUT)
+        )
+        # A POST isn't retried, it could be repeated on the server
+        attempts = 1 + (config.UPSTREAM_RETRIES if method == 'GET' else 0)
+        error: Optional[Exception] = None
+        with (
+            tracer.span('Parser._send', method=method, endpoint=endpoint),
+            metrics.track(
+                metrics.upstream_duration,
+                metrics.upstream_errors,
+                metrics.upstream_in_flight,
+                endpoint,
+            ),
+            self.get_breaker(url).guard(),
+        ):
+            for attempt in range(attempts):
                 try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    logger.error(e)
-                    await message.answer(str(e))
-                    return None
-
-            return wrapped
-
-        return wrapper
+                    async with self.get_session().request(
+                        method,
+                        url,
+                        headers=headers,
+                        params=params,
+                        cookies=cookies,
+                        json=params if method == 'POST' else None,
+                        timeout=timeout,
+                    ) as response:
+                        response.raise_for_status()
+                        return await response.read()
+                except ClientResponseError as e:
+                    if e.status == 400:
+                        raise ServerError
+                    if e.status == 401:
+                        raise ExpiredTokenError
+                    if e.status < 500:
+                        raise
+                    error = e
+                except (asyncio.TimeoutError, ClientConnectionError) as e:
+                    error = e
+
+                if attempt + 1 < attempts:
+                    # Full jitter, so the retries of many users don't come at once
+                    delay = random.uniform(
+                        0, min(config.UPSTREAM_BACKOFF_MAX, config.UPSTREAM_BACKOFF * 2**attempt)
+                    )
+                    logger.warning(
+                        f'{method} {endpoint} has failed: {error!r}, retry in {delay:.2f}s'
+                    )
+                    metrics.upstream_retries.inc(endpoint)
+                    await asyncio.sleep(delay)
+            raise UnavailableError from error
 
     @staticmethod
     def _get_monday_date(date: datetime) -> datetime:
@@ -145,135 +219,258 @@ class Parser:
             'sec-ch-ua-platform': '"Windows"',
         }
 
-    def _get_person_id(self) -> str:
-        json_data = {'auth_token': self.token}
+    async def _ensure_student_id(self) -> int:
+        if self.student_id is None:
+            self.student_id = await self.get_student_id()
+        return self.student_id
 
-        response = self._request(
-            'https://authedu.mosreg.ru/api/ej/acl/v1/sessions', params=json_data, method='POST'
-        )
-        return response['person_id']
+    async def _ensure_person_id(self) -> str:
+        if self.person_id is None:
+            self.person_id = await self.get_person_id()
+        return self.person_id
 
-    @request_handler()
     # Methods for obtaining data
-    def get_homework(self, date: datetime = datetime.now()) -> HomeworkWeek:
+    @tracer.traced
+    async def get_homework(
+        self, date: Optional[datetime] = None, refresh: bool = False
+    ) -> HomeworkWeek:
         """The function is parsing homework from "Моя школа".
 
         Args:
             date (datetime): Date for which you need to analyze. By default - today's date
+            refresh (bool): Requests the week even if it's cached.
+
         Returns:
             A response from "Моя школа" with homework as dictionary
         """
-        monday = self._get_monday_date(date)
+        monday = self._get_monday_date(date or datetime.now())
 
         date_start = monday
         date_end = monday + timedelta(days=4)
 
         logger.debug(f'{date_start} - {date_end}')
 
-        if self.student_id is None:
-            self.student_id = self.get_student_id()
+        student_id = await self._ensure_student_id()
 
         params = {
             'from': date_start.strftime('%Y-%m-%d'),
             'to': date_end.strftime('%Y-%m-%d'),
-            'student_id': self.student_id,
+            'student_id': student_id,
         }
 
-        response = self._request(
-            'https://authedu.mosreg.ru/api/family/web/v1/homeworks',
-            params=params,
-            # cookies=cookie,
+        return await self.cache.get_or_fetch(
+            student_id,
+            date_start.date(),
+            'homework',
+            lambda: self._request(
+                f'{config.AUTHEDU_URL}/api/family/web/v1/homeworks',
+                params=params,
+                # cookies=cookie,
+            ),
+            lambda raw, fetched_at: HomeworkWeek(
+                student_id, date_start, date_end, raw, timestamp=fetched_at
+            ),
+            refresh,
         )
 
-        return HomeworkWeek(self.student_id, date_start, date_end, response)
-
-    @request_handler()
-    def get_marks(self, date: datetime = datetime.now(), split: bool = True) -> dict[str, dict]:
+    @tracer.traced
+    async def get_marks(self, date: Optional[datetime] = None) -> MarksWeek:
         """He function for getting marks.
 
         Args:
             date (datetime): Date for which you need to analyze. By default - today's date
-            split(bool): Should be divided by days
         Returns:
-            Tuple of date and marks
+            Marks of the week divided by days
         """
-        monday = self._get_monday_date(date)
+        monday = self._get_monday_date(date or datetime.now())
 
         date_start = monday
         date_end = monday + timedelta(days=4)
 
         cookie = {'aupd_token': self.token}
 
+        student_id = await self._ensure_student_id()
+
         params = {
             'from': date_start.strftime('%Y-%m-%d'),
             'to': date_end.strftime('%Y-%m-%d'),
-            'student_id': self.student_id,
+            'student_id': student_id,
         }
 
-        response = self._request(
-            'https://authedu.mosreg.ru/api/family/web/v1/marks',
-            params=params,
-            cookies=cookie,
+        return await self.cache.get_or_fetch(
+            student_id,
+            date_start.date(),
+            'marks',
+            lambda: self._request(
+                f'{config.AUTHEDU_URL}/api/family/web/v1/marks',
+                params=params,
+                cookies=cookie,
+            ),
+            lambda raw, _: MarksWeek(date_start, date_end, raw),
         )
 
-        response['date'] = {
-            'begin_date': date_start,
-            'end_date': date_end,
-        }
-
-        if split:
-            return self.split_day(response, 'marks')
-        else:
-            return response
-
-    @request_handler()
-    def get_schedule(self, split: bool = True) -> dict[str, dict]:
+    @tracer.traced
+    async def get_schedule(self) -> ScheduleWeek:
         """The function for getting the schedule.
 
-        Args:
-            split (bool): Split the schedule into days
         Returns:
-             A response from "Моя школа" with schedule as dictionary
+             Lessons of the week divided by days
         """
-        person_id = self._get_person_id()
-
         monday = self._get_monday_date(datetime.now())
         date_start = monday
         date_end = monday + timedelta(days=4)
 
         logger.debug(f'{date_start} - {date_end}')
 
-        params = {
-            'person_ids': person_id,
-            'begin_date': date_start.strftime('%Y-%m-%d'),
-            'end_date': date_end.strftime('%Y-%m-%d'),
-        }
+        async def request_events() -> bytes:
+            params = {
+                'person_ids': await self._ensure_person_id(),
+                'begin_date': date_start.strftime('%Y-%m-%d'),
+                'end_date': date_end.strftime('%Y-%m-%d'),
+            }
+            return await self._request(
+                f'{config.AUTHEDU_URL}/api/eventcalendar/v1/api/events',
+                params=params,
+            )
 
-        response = self._request(
-            'https://authedu.mosreg.ru/api/eventcalendar/v1/api/events',
-            params=params,
+        async def fetch() -> bytes:
+            known = self.person_id is not None
+            try:
+                return await request_events()
+            except ExpiredTokenError:
+                if not known:
+                    raise
+                # The stored person ID could be outdated, it's resolved again once
+                self.identities.pop(('person_id', self.token))
+                self.person_id = None
+                return await request_events()
+
+        return await self.cache.get_or_fetch(
+            await self._ensure_student_id(),
+            date_start.date(),
+            'schedule',
+            fetch,
+            lambda raw, _: ScheduleWeek(date_start, date_end, raw),
         )
 
-        response['date'] = {
-            'begin_date': date_start,
-            'end_date': date_end,
+    # Ranges of weeks
+    @tracer.traced
+    async def _get_range(
+        self,
+        kind: Kind,
+        url: str,
+        start: datetime,
+        end: datetime,
+        build: Callable[[datetime, bytes, datetime], Any],
+        cookies: dict | None = None,
+    ) -> list[Any]:
+        """Returns the objects of every week of the range, the missing ones by one request.
+
+        The upstream response of the missing weeks is split by weeks and every week is cached as
+        if it was requested alone.
+
+        Args:
+            kind (Kind): Type of the data.
+            url (str): Endpoint accepting `from`, `to` and `student_id`.
+            start (datetime): Any day of the first week.
+            end (datetime): Any day of the last week.
+            build (Callable): Makes the object of a week from its Monday, raw response and the time
+                the response was fetched.
+            cookies (dict, optional): Cookies of the request.
+        """
+        first, last = self._get_monday_date(start), self._get_monday_date(end)
+        mondays = [first + timedelta(weeks=i) for i in range((last - first).days // 7 + 1)]
+        student_id = await self._ensure_student_id()
+
+        weeks = [
+            await self.cache.get(
+                student_id,
+                monday.date(),
+                kind,
+                lambda raw, fetched_at, monday=monday: build(monday, raw, fetched_at),
+            )
+            for monday in mondays
+        ]
+        missing = [monday for monday, week in zip(mondays, weeks) if week is None]
+        if not missing:
+            return weeks
+
+        logger.debug(f'{kind} of {len(missing)} weeks: {missing[0]} - {missing[-1]}')
+        params = {
+            'from': missing[0].strftime('%Y-%m-%d'),
+            'to': (missing[-1] + timedelta(days=4)).strftime('%Y-%m-%d'),
+            'student_id': student_id,
         }
+        response = await self._request(url, params=params, cookies=cookies)
+        parts = split_by_week(response, (monday.date() for monday in missing))
+        fetched_at = datetime.now()
+
+        for i, monday in enumerate(mondays):
+            if weeks[i] is None:
+                raw = parts[monday.date()]
+                weeks[i] = build(monday, raw, fetched_at)
+                await self.cache.put(student_id, monday.date(), kind, raw, weeks[i], fetched_at)
+        return weeks
+
+    async def get_homework_range(self, start: datetime, end: datetime) -> list[HomeworkWeek]:
+        """Returns the homework of every week from `start` to `end` by one request at most."""
+        student_id = await self._ensure_student_id()
+        return await self._get_range(
+            'homework',
+            f'{config.AUTHEDU_URL}/api/family/web/v1/homeworks',
+            start,
+            end,
+            lambda monday, raw, fetched_at: HomeworkWeek(
+                student_id, monday, monday + timedelta(days=4), raw, timestamp=fetched_at
+            ),
+        )
 
-        if split:
-            return self.split_day(response, 'schedule')
-        else:
-            return response
+    async def get_marks_range(self, start: datetime, end: datetime) -> list[MarksWeek]:
+        """Returns the marks of every week from `start` to `end` by one request at most."""
+        return await self._get_range(
+            'marks',
+            f'{config.AUTHEDU_URL}/api/family/web/v1/marks',
+            start,
+            end,
+            lambda monday, raw, _: MarksWeek(monday, monday + timedelta(days=4), raw),
+            cookies={'aupd_token': self.token},
+        )
 
-    @request_handler()
-    def get_student_id(self) -> int:
+    @tracer.traced
+    async def get_student_id(self) -> int:
         """The function for getting student id.
 
         Returns:
             student_id for "Моя школа"
         """
+        if (student_id := self.identities.get(('student_id', self.token))) is not None:
+            return student_id
+
         headers = self._headers
         headers['Auth-Token'] = self.token
 
-        return self._request(
-            'https://myschool.mosreg.ru/acl/api/users/profile_info', headers=headers
-        )[0]['id']
+        response = await self._request(
+            f'{config.MYSCHOOL_URL}/acl/api/users/profile_info', headers=headers
+        )
+        student_id = msgspec.json.decode(response)[0]['id']
+        self.identities.set(('student_id', self.token), student_id)
+        return student_id
+
+    @tracer.traced
+    async def get_person_id(self) -> str:
+        """The function for getting person id, it's needed for the schedule.
+
+        Returns:
+            person_id for "Моя школа"
+        """
+        if (person_id := self.identities.get(('person_id', self.token))) is not None:
+            return person_id
+
+        response = await self._request(
+            f'{config.AUTHEDU_URL}/api/ej/acl/v1/sessions',
+            params={'auth_token': self.token},
+            method='POST',
+        )
+        person_id = msgspec.json.decode(response)['person_id']
+        self.identities.set(('person_id', self.token), person_id)
+        return person_id
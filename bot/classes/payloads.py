@@ -0,0 +1,107 @@
+"""Typed structs of the "Моя школа" responses.
+
+The responses are decoded straight from the raw bytes into these structs, only the fields listed
+here are decoded, the rest of the payload is skipped by the decoder.
+"""
+
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from msgspec import Raw, Struct
+from msgspec.json import Decoder
+
+
+# Homework
+class MaterialUrl(Struct):
+    url: str = ''
+
+
+class MaterialItem(Struct):
+    title: str = ''
+    link: Optional[str] = None
+    urls: list[MaterialUrl] = []
+
+
+class Material(Struct):
+    items: list[MaterialItem] = []
+
+
+class HomeworkItem(Struct):
+    date: str
+    subject_name: str = ''
+    homework: Optional[str] = None
+    additional_materials: Optional[list[Material]] = None
+
+
+class HomeworkPayload(Struct):
+    payload: list[HomeworkItem] = []
+
+
+# Marks
+class MarkItem(Struct):
+    date: str
+    subject_name: str
+    value: str | int
+
+
+class MarksPayload(Struct):
+    payload: Optional[list[MarkItem]] = None
+
+
+# Schedule
+class EventItem(Struct):
+    start_at: str
+    subject_name: Optional[str] = None
+    room_number: Optional[str | int] = None
+
+
+class EventsPayload(Struct):
+    total_count: int = 0
+    response: list[EventItem] = []
+
+
+# Any response with `payload` of dated items, the items are kept undecoded
+class DatedItem(Struct):
+    date: str
+
+
+class RawPayload(Struct):
+    payload: Optional[list[Raw]] = None
+
+
+homework_decoder = Decoder(HomeworkPayload)
+marks_decoder = Decoder(MarksPayload)
+events_decoder = Decoder(EventsPayload)
+dated_item_decoder = Decoder(DatedItem)
+raw_payload_decoder = Decoder(RawPayload)
+
+
+@lru_cache(maxsize=1024)
+def parse_date(value: str) -> date:
+    """Parses the date part of an ISO string, a week has only a few unique dates.
+
+    Args:
+        value (str): Date as "YYYY-MM-DD" optionally followed by the time.
+    """
+    return date.fromisoformat(value[:10])
+
+
+def split_by_week(response: bytes, mondays: Iterable[date]) -> dict[date, bytes]:
+    """Splits a homework or marks response of several weeks into a response per week.
+
+    The items are copied as they are, so every part is decoded as a response of one week.
+
+    Args:
+        response (bytes): Raw response with `payload` of items which have `date`.
+        mondays (Iterable[date]): Mondays of the weeks, items of other weeks are skipped.
+
+    Returns:
+        Raw response of every week by its Monday
+    """
+    weeks: dict[date, list[Raw]] = {monday: [] for monday in mondays}
+    for item in raw_payload_decoder.decode(response).payload or ():
+        day = parse_date(dated_item_decoder.decode(item).date)
+        if (items := weeks.get(day - timedelta(days=day.weekday()))) is not None:
+            items.append(item)
+    return {monday: b'{"payload":[%s]}' % b','.join(items) for monday, items in weeks.items()}
@@ -0,0 +1,143 @@
+from datetime import timedelta
+from typing import Callable, Hashable, Iterable, Optional
+
+from bot.config import config
+from bot.until import TTLCache
+
+from .homework import HomeworkWeek, StudyDay
+from .marks import MarksWeek
+from .payloads import EventItem
+from .schedule import ScheduleWeek
+from .study_week import WEEKDAY_INDEX
+
+MAX_WIDTH_MESSAGE = 33
+
+
+class Renderer:
+    """Renders the data views to Markdown and caches the texts.
+
+    The texts are cached by the content hash of the data they are rendered from, so a changed week
+    gets new texts and the outdated ones are evicted as the least recently used. Every hash keeps
+    all its variants (settings, day) together, so they are evicted or discarded at once.
+    """
+
+    def __init__(self, maxsize: int = config.RENDER_CACHE_SIZE):
+        self.cache = TTLCache(maxsize)
+
+    def discard(self, content_hash: str):
+        """Drops the texts of the outdated content."""
+        self.cache.pop(content_hash)
+
+    def _cached(self, content_hash: str, variant: Hashable, render: Callable[[], str]) -> str:
+        variants = self.cache.get(content_hash)
+        if variants is None:
+            variants = {}
+            self.cache.set(content_hash, variants)
+        if (text := variants.get(variant)) is None:
+            text = variants[variant] = render()
+        return text
+
+    # Homework
+    def homework(self, week: HomeworkWeek, dw: bool, hide_link: bool, day: int) -> str:
+        """Returns the homework for the week if `dw`, otherwise for the day with index `day`."""
+        if dw:
+            return self._cached(
+                week.content_hash,
+                (dw, hide_link),
+                lambda: ''.join(
+                    f'{self.homework(week, False, hide_link, i)}\n\n\n'
+                    for i in range(len(week.days))
+                ),
+            )
+        return self._cached(
+            week.content_hash,
+            (dw, hide_link, day),
+            lambda: self._render_homework_day(week[day], hide_link),
+        )
+
+    @staticmethod
+    def _render_homework_day(day: StudyDay, hide_link: bool) -> str:
+        parts = [f'*Домашка на {day.name} ({day.date.strftime("%d.%m")})*:\n']
+        for lesson in day:
+            if lesson.links:
+                if hide_link:
+                    links = '\n\t\t\t'.join(f'[{link.name}]({link.link})' for link in lesson.links)
+                else:
+                    links = '\n\t\t\t'.join(link.link.replace('_', r'\_') for link in lesson.links)
+                parts.append(f'*• {lesson.name}:*\n\t├ _{lesson.homework}_\n\t└ {links}\n')
+            else:
+                parts.append(f'*• {lesson.name}:*\n\t└ _{lesson.homework}_\n')
+        body = ''.join(parts)
+        width = min(MAX_WIDTH_MESSAGE, max(map(len, body.split('\n'))))
+        return f'{body}{"-" * width}\nВсего задано уроков: {len(day)}'
+
+    # Marks
+    def marks(self, marks: MarksWeek, dw: bool, today: str) -> str:
+        """Returns the marks for the week if `dw`, otherwise for `today`."""
+        variant = dw if dw else (dw, today)
+        return self._cached(
+            marks.content_hash, variant, lambda: self._render_marks(marks, dw, today)
+        )
+
+    @staticmethod
+    def _render_marks(marks: MarksWeek, dw: bool, today: str) -> str:
+        begin = marks.begin.strftime('%d.%m')
+        if dw:
+            parts = [f'*Оценки за неделю ({begin} - {marks.end.strftime("%d.%m")}):*\n']
+            if not marks.empty:
+                parts.extend(
+                    f'*{name_of_day}:*\n{_tree(f"*{name}*: {value}" for name, value in day)}\n\n'
+                    for name_of_day, day in marks
+                    if day
+                )
+            else:
+                parts.append('\t└ Оценки за этот период отсутствуют')
+        else:
+            parts = [f'*Оценки за сегодняшний день ({today}, {begin}):*\n']
+            if today in WEEKDAY_INDEX and marks[today]:
+                parts.append(_tree(f'*{name}*: {value}' for name, value in marks[today]))
+            else:
+                parts.append('\t└ Оценки за сегодняшний день отсутствуют')
+        return ''.join(parts)
+
+    # Schedule
+    def schedule(self, schedule: ScheduleWeek, dw: bool, day: Optional[str] = None) -> str:
+        """Returns the schedule for the week if `dw`, otherwise for the `day`."""
+        variant = dw if dw else (dw, day)
+        return self._cached(
+            schedule.content_hash, variant, lambda: self._render_schedule(schedule, dw, day)
+        )
+
+    @staticmethod
+    def _render_schedule(schedule: ScheduleWeek, dw: bool, day: Optional[str]) -> str:
+        if dw:
+            begin = schedule.begin.strftime('%d.%m')
+            end = schedule.end.strftime('%d.%m')
+            parts = [f'*Расписание на неделю ({begin} - {end}):*']
+            parts.extend(
+                f'\n\n*{name_of_day}:*\n{_tree(_schedule_lines(lessons))}'
+                for name_of_day, lessons in schedule
+            )
+            total = schedule.total_count
+        elif day is not None:
+            lessons = schedule[day]
+            date = (schedule.begin + timedelta(days=WEEKDAY_INDEX[day])).strftime('%d.%m')
+            parts = [f'*Расписание на {day} ({date}):*\n', _tree(_schedule_lines(lessons))]
+            total = len(lessons)
+        else:
+            raise ValueError('The day is required for the schedule of one day')
+        body = ''.join(parts)
+        return f'{body}\n{"-" * min(MAX_WIDTH_MESSAGE, len(body))}\nВсего уроков: {total}\n'
+
+
+def _schedule_lines(lessons: list[EventItem]) -> list[str]:
+    return [f'{lesson.subject_name} ({lesson.room_number})' for lesson in lessons]
+
+
+def _tree(lines: Iterable[str]) -> str:
+    """Joins the lines to a tree branch, the last one is closed by "└"."""
+    lines = list(lines)
+    return '\n'.join(f'\t{"├└"[i == len(lines)]} {line}' for i, line in enumerate(lines, start=1))
+
+
+renderer = Renderer()
@@ -0,0 +1,162 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Literal
+
+from bot.config import config
+from bot.until import TTLCache, UnavailableError, logger
+from database import DataBaseCrud, ResponseCacheModel
+
+Kind = Literal['homework', 'marks', 'schedule']
+
+
+class ResponseCache:
+    """Read-through cache for the "Моя школа" data.
+
+    The first tier is an in-process LRU with the ready objects, the second one is the
+    `response_cache` table with the raw responses, so the cache survives a restart.
+    Entries are keyed by `(student_id, monday, kind)`. While "Моя школа" is unavailable the last
+    response is served even if it has expired, the object is marked as stale.
+    """
+
+    def __init__(self, maxsize: int = config.CACHE_MAX_ENTRIES, db: DataBaseCrud | None = None):
+        self.memory = TTLCache(maxsize)
+        self.db = db or DataBaseCrud()
+        self.ttl: dict[str, int] = {
+            'homework': config.CACHE_TTL_HOMEWORK,
+            'marks': config.CACHE_TTL_MARKS,
+            'schedule': config.CACHE_TTL_SCHEDULE,
+        }
+        self.db_hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    async def get(
+        self, student_id: int, monday: date, kind: Kind, build: Callable[[bytes, datetime], Any]
+    ) -> Any:
+        """Returns the cached object or None, the object is built if it's found in the database.
+
+        Args:
+            student_id (int): ID of the student whose data it is.
+            monday (date): Monday of the requested week.
+            kind (Kind): Type of the data.
+            build (Callable): Makes the object returned to the caller from the raw response and the
+                time it was fetched.
+        """
+        key = (student_id, monday, kind)
+        if (value := self.memory.get(key)) is not None:
+            return value
+
+        if entry := await self.db.get_cached_response(student_id, monday, kind):
+            self.db_hits += 1
+            # The object is as old as the response, so a rebuild doesn't renew it
+            value = build(entry.payload.encode(), entry.fetched_at)
+            ttl = (entry.expires_at - datetime.now()).total_seconds()
+            self.memory.set(key, value, ttl)
+            return value
+
+        self.misses += 1
+        return None
+
+    async def get_stale(
+        self, student_id: int, monday: date, kind: Kind, build: Callable[[bytes, datetime], Any]
+    ) -> Any:
+        """Returns the object of the last response, even an expired one, or None.
+
+        The object is marked as stale and isn't kept in memory, so the fresh data is requested
+        again as soon as the server is back.
+
+        Args:
+            student_id (int): ID of the student whose data it is.
+            monday (date): Monday of the requested week.
+            kind (Kind): Type of the data.
+            build (Callable): Makes the object returned to the caller from the raw response and the
+                time it was fetched.
+        """
+        entry = await self.db.get_cached_response(student_id, monday, kind, allow_expired=True)
+        if entry is None:
+            return None
+
+        self.stale_hits += 1
+        value = build(entry.payload.encode(), entry.fetched_at)
+        value.stale = True
+        logger.warning(f'Stale {kind} of {student_id} for {monday} is served')
+        return value
+
+    async def put(
+        self,
+        student_id: int,
+        monday: date,
+        kind: Kind,
+        response: bytes,
+        value: Any,
+        fetched_at: datetime,
+    ):
+        """Caches the object and its raw response.
+
+        Args:
+            student_id (int): ID of the student whose data it is.
+            monday (date): Monday of the week.
+            kind (Kind): Type of the data.
+            response (bytes): Raw response the object is built from.
+            value (Any): The object returned to the caller.
+            fetched_at (datetime): When the response was fetched.
+        """
+        self.memory.set((student_id, monday, kind), value, self.ttl[kind])
+        await self.db.set_cached_response(
+            ResponseCacheModel(
+                student_id=student_id,
+                monday=monday,
+                kind=kind,
+                payload=response.decode(),
+                fetched_at=fetched_at,
+                expires_at=datetime.now() + timedelta(seconds=self.ttl[kind]),
+            )
+        )
+        logger.debug(f'{kind} of {student_id} for {monday} has been cached')
+
+    async def get_or_fetch(
+        self,
+        student_id: int,
+        monday: date,
+        kind: Kind,
+        fetch: Callable[[], Awaitable[bytes]],
+        build: Callable[[bytes, datetime], Any],
+        refresh: bool = False,
+    ) -> Any:
+        """Returns the cached object or fetches, caches and returns a new one.
+
+        If the server is unavailable, the stale object is returned instead (see `get_stale`).
+
+        Args:
+            student_id (int): ID of the student whose data it is.
+            monday (date): Monday of the requested week.
+            kind (Kind): Type of the data.
+            fetch (Callable): Coroutine function requesting the raw response.
+            build (Callable): Makes the object returned to the caller from the raw response and the
+                time it was fetched.
+            refresh (bool): The cached object is skipped, the fetched one replaces it.
+        """
+        if not refresh and (value := await self.get(student_id, monday, kind, build)) is not None:
+            return value
+
+        try:
+            response = await fetch()
+        except UnavailableError:
+            if (value := await self.get_stale(student_id, monday, kind, build)) is None:
+                raise
+            return value
+
+        fetched_at = datetime.now()
+        value = build(response, fetched_at)
+        await self.put(student_id, monday, kind, response, value, fetched_at)
+        return value
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            'size': len(self.memory),
+            'hits': self.memory.hits,
+            'db_hits': self.db_hits,
+            'misses': self.misses,
+            'stale_hits': self.stale_hits,
+            'evictions': self.memory.evictions,
+        }
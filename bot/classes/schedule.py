@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from .payloads import events_decoder, parse_date
+from .study_week import StudyWeek
+
+
+class ScheduleWeek(StudyWeek):
+    """Lessons of a week divided by days."""
+
+    __slots__ = ('total_count',)
+
+    def __init__(self, begin: datetime, end: datetime, response: bytes):
+        self.total_count = 0
+        super().__init__(begin, end, response)
+
+    def _fill(self, response: bytes):
+        events = events_decoder.decode(response)
+        self.total_count = events.total_count
+        for lesson in events.response:
+            if (weekday := parse_date(lesson.start_at).weekday()) < len(self._days):
+                self._days[weekday].append(lesson)
@@ -0,0 +1,58 @@
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from hashlib import sha256
+from typing import Any, Iterator
+
+from bot.until import get_weekday
+
+WEEKDAYS: tuple[str, ...] = tuple(get_weekday()[:5])
+# Index of the study day by its name
+WEEKDAY_INDEX: dict[str, int] = {name: i for i, name in enumerate(WEEKDAYS)}
+
+
+class StudyWeek(ABC):
+    """Items of a study week (Monday - Friday) divided by days.
+
+    A day is found in O(1) by its index (0 is Monday), by its name or by its date. Items of the
+    weekend are skipped.
+    """
+
+    __slots__ = ('begin', 'end', 'content_hash', 'stale', '_days')
+
+    def __init__(self, begin: datetime, end: datetime, response: bytes):
+        """Initializes the week.
+
+        Args:
+            begin (datetime): Monday of the week.
+            end (datetime): Friday of the week.
+            response (bytes): Raw response of "Моя школа".
+        """
+        self.begin = begin
+        self.end = end
+        # The rendered views are cached by it. The titles show the dates, so they're hashed too: an
+        # empty week has the same response for every week
+        content = sha256(f'{begin.date()}:{end.date()}:'.encode())
+        content.update(response)
+        self.content_hash = content.hexdigest()
+        # Built from an outdated response while "Моя школа" is unavailable
+        self.stale = False
+        self._days: tuple[list[Any], ...] = tuple([] for _ in WEEKDAYS)
+        self._fill(response)
+
+    @abstractmethod
+    def _fill(self, response: bytes):
+        """Divides the items of the raw response by days."""
+
+    def __getitem__(self, day: int | str | date) -> list[Any]:
+        if isinstance(day, str):
+            return self._days[WEEKDAY_INDEX[day]]
+        if isinstance(day, date):
+            return self._days[day.weekday()]
+        return self._days[day]
+
+    def __iter__(self) -> Iterator[tuple[str, list[Any]]]:
+        """Iterates over the days as `(name of the day, items)`."""
+        return zip(WEEKDAYS, self._days)
+
+    def __len__(self) -> int:
+        return sum(map(len, self._days))
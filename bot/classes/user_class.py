@@ -1,12 +1,17 @@
-import asyncio
-from typing import Optional, Union
+from datetime import datetime, timedelta
+from typing import ClassVar, Optional, Union
 
 from aiogram.types import Message
 
-from bot.until import logger
+from bot.config import config
+from bot.until import TTLCache, logger, tracer
 from database import DataBaseCrud, UserModel
 
+from .homework import HomeworkWeek
+from .notifier import notifier
 from .parser import Parser
+from .renderer import renderer
+from .schedule import ScheduleWeek
 from .serialization_mixin import SerializationMixin
 
 db = DataBaseCrud()
@@ -14,6 +19,8 @@ db = DataBaseCrud()
 
 class UserClass(SerializationMixin):
     model = UserModel
+    # Live users by Telegram ID, so an update doesn't need a database query
+    cache: ClassVar[TTLCache] = TTLCache(config.USER_CACHE_SIZE, config.USER_CACHE_TTL)
 
     def __init__(
         self,
@@ -25,6 +32,7 @@ class UserClass(SerializationMixin):
         setting_hide_link: Optional[bool] = True,
         token: Optional[str] = None,
         student_id: Optional[int] = None,
+        person_id: Optional[str] = None,
         homework_id: Optional[int] = None,
         **kwargs,
     ):
@@ -39,6 +47,7 @@ class UserClass(SerializationMixin):
             setting_hide_link (bool, optional): A flag indicating whether to hide links. Defaults to True.
             token (str, optional): The authentication token for the user. Defaults to None.
             student_id (int, optional): The ID of the student. Defaults to None.
+            person_id (str, optional): The ID of the person for the schedule. Defaults to None.
             homework_id (int, optional): The ID of the homework. Defaults to None.
             kwargs: Additional keyword arguments.
         """
@@ -58,23 +67,41 @@ class UserClass(SerializationMixin):
             debug,
         )
 
-        self.parser = Parser(token, student_id)
+        self.parser = Parser(token, student_id, person_id)
         self._token = token
         self.student_id = student_id
+        self.person_id = person_id
         self.homework_id = homework_id
 
-        asyncio.create_task(db.add_user(self.to_model()))
+    def to_model(self) -> UserModel:
+        model = super().to_model()
+        model.token = self.token
+        model.student_id = self.student_id
+        model.person_id = self.person_id
+        return model
 
     @staticmethod
-    async def get_user(message: Union[Message, 'UserClass']):
+    @tracer.traced
+    async def get_user(message: Union[Message, 'UserClass']) -> 'UserClass':
+        """Returns the user who sent the message, a new user is added to the database.
+
+        Users are kept in the cache, every change of a cached user is written to the database by
+        `save_settings` and `save_token`, so the cached user is always the actual one.
+        """
         if isinstance(message, UserClass):
             return message
-        else:
-            user_db = await db(message.from_user.id)
-            if user_db is not None:
-                return UserClass.from_model(user_db)
-            else:
-                return UserClass(message.from_user.id, message.from_user.username)
+
+        userid = message.from_user.id
+        if (user := UserClass.cache.get(userid)) is not None:
+            return user
+
+        user = UserClass.from_model(await db(userid))
+        if user is None:
+            # The username is optional in Telegram, the column isn't
+            user = UserClass(userid, message.from_user.username or message.from_user.full_name)
+            await db.add_user(user.to_model())
+        UserClass.cache.set(userid, user)
+        return user
 
     async def save_settings(
         self,
@@ -101,6 +128,64 @@ class UserClass(SerializationMixin):
         await db.update_user(self)  # type: ignore
         logger.debug(f'The new settings for user {self.username} have been saved!')
 
+    async def save_token(self, token: str):
+        """Sets the new token, resolves the student and person IDs for it and saves them."""
+        self.token = token
+        self.student_id = await self.parser.get_student_id()
+        self.person_id = await self.parser.get_person_id()
+        await db.update_user(self, ('token', 'student_id', 'person_id'))  # type: ignore
+
+    @tracer.traced
+    async def get_schedule(self) -> ScheduleWeek:
+        """Returns the schedule, the person ID is saved if the parser had to resolve it."""
+        schedule = await self.parser.get_schedule()
+        if self.parser.person_id != self.person_id:
+            self.person_id = self.parser.person_id
+            await db.update_user(self, ('person_id',))  # type: ignore
+        return schedule
+
+    async def delete(self):
+        """Deletes the user from the database and from the cache."""
+        UserClass.cache.pop(self.userid)
+        await db.delete_user(self.userid)
+
+    @tracer.traced
+    async def get_homework(
+        self,
+        max_age: timedelta = timedelta(hours=1),
+        notify_self: bool = False,
+        refresh: bool = False,
+    ) -> HomeworkWeek:
+        """Returns the user's homework for this week.
+
+        The week stored in the database is used while it's fresh (a classmate could have already
+        fetched it), otherwise the week is requested and stored. If the requested week differs from
+        the stored one, the new lessons are pushed to everyone who has this week. A stale week
+        (served while "Моя школа" is unavailable) is neither stored nor compared.
+
+        Args:
+            max_age (timedelta): Maximum age of the stored week.
+            notify_self (bool): Whether the user gets the notification too (they requested the
+                homework themselves otherwise).
+            refresh (bool): An outdated week is requested from "Моя школа" even if its response
+                is cached, so a change is found as soon as it's made.
+        """
+        stored = HomeworkWeek.from_model(await db.get_homework(self.userid, max_age=None))
+        if stored and datetime.now() - stored.timestamp < max_age:
+            return stored
+
+        hk = await self.parser.get_homework(refresh=refresh)
+        if hk.stale:
+            return hk
+        stored_week = await db.add_homework(self.userid, hk.to_model())
+        # Only the first one who got the new content notifies, others find it already stored
+        if stored_week and stored_week[1] and stored and stored.begin.date() == hk.begin.date():
+            renderer.discard(stored.content_hash)
+            if changes := hk.diff(stored):
+                exclude = None if notify_self else self.userid
+                await notifier.notify(stored_week[0], changes, exclude)
+        return hk
+
     def check_token(self) -> bool:
         return self._token is not None and self.student_id is not None
 
@@ -112,6 +197,8 @@ class UserClass(SerializationMixin):
     def token(self, value):
         self._token = value
         self.parser.token = value
+        # The person ID belongs to the token
+        self.person_id = None
 
     @property
     def student_id(self):
@@ -121,3 +208,12 @@ class UserClass(SerializationMixin):
     def student_id(self, value):
         self._student_id = value
         self.parser.student_id = value
+
+    @property
+    def person_id(self):
+        return self._person_id
+
+    @person_id.setter
+    def person_id(self, value):
+        self._person_id = value
+        self.parser.person_id = value
@@ -1,6 +1,7 @@
 __all__ = ('config',)
 
 from sys import argv
+from typing import Literal, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -17,6 +18,112 @@ class Config(BaseSettings):
 
     ADMIN_IDS: list[int]
 
+    LOG_FILE: str = 'temp/log.log'
+
+    # Updates are received by long polling or by a webhook served by the bot itself
+    BOT_MODE: Literal['polling', 'webhook'] = 'polling'
+    WEBHOOK_URL: str = ''  # public HTTPS URL Telegram sends the updates to
+    WEBHOOK_HOST: str = '0.0.0.0'
+    WEBHOOK_PORT: int = 8080
+    WEBHOOK_PATH: str = '/webhook'
+    WEBHOOK_SECRET: Optional[str] = None  # a random one is made on start if it isn't set
+    WEBHOOK_QUEUE_SIZE: int = 1000
+    WEBHOOK_WORKERS: int = 32
+    WEBHOOK_SHUTDOWN_TIMEOUT: float = 30
+
+    # Updates are handled by this many worker processes, the users are sharded between them
+    WORKERS: int = 1
+    WORKER_QUEUE_SIZE: int = 1000  # updates waiting for a worker
+    WORKER_CONCURRENCY: int = 32  # updates handled at once by a worker
+    WORKER_SHUTDOWN_TIMEOUT: float = 30
+
+    # "Моя школа" API, can be pointed to a local mock (see bot/tests/mock_mosreg.py)
+    AUTHEDU_URL: str = 'https://authedu.mosreg.ru'
+    MYSCHOOL_URL: str = 'https://myschool.mosreg.ru'
+
+    # SQLite storage profile, the pragmas are applied to every new connection
+    DB_JOURNAL_MODE: str = 'WAL'
+    DB_SYNCHRONOUS: str = 'NORMAL'
+    DB_MMAP_SIZE: int = 256 * 1024 * 1024
+    DB_CACHE_SIZE: int = -64_000  # negative is in KiB
+    DB_BUSY_TIMEOUT: int = 5000  # ms
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+
+    # Write-behind queue of user changes
+    DB_WRITE_DELAY: float = 1.0
+    DB_WRITE_BATCH_SIZE: int = 500
+    DB_WRITE_MAX_RETRY_DELAY: float = 60  # a failed write is retried, the delay doubles up to it
+
+    # FSM states (e.g. the token input) in the database, abandoned ones expire
+    FSM_STATE_TTL: int = 24 * 60 * 60
+    FSM_CACHE_SIZE: int = 10_000
+
+    # Upstream HTTP pool (shared by all parsers)
+    HTTP_POOL_LIMIT: int = 100
+    HTTP_POOL_LIMIT_PER_HOST: int = 20
+    HTTP_DNS_CACHE_TTL: int = 300
+    HTTP_KEEPALIVE_TIMEOUT: float = 30
+
+    # Resilience of the upstream requests: total timeouts in seconds (by endpoint path), retries
+    # of GETs with a jittered exponential backoff and the circuit breaker of a host, which fails
+    # fast for a while after a number of failures in a row
+    UPSTREAM_TIMEOUT: float = 10
+    UPSTREAM_TIMEOUTS: dict[str, float] = {'/api/family/web/v1/homeworks': 15}
+    UPSTREAM_RETRIES: int = 2
+    UPSTREAM_BACKOFF: float = 0.5
+    UPSTREAM_BACKOFF_MAX: float = 4
+    BREAKER_THRESHOLD: int = 5
+    BREAKER_RESET_TIMEOUT: float = 30
+
+    # Cache of the "Моя школа" data, TTLs are in seconds
+    CACHE_MAX_ENTRIES: int = 2048
+    CACHE_TTL_HOMEWORK: int = 60 * 60
+    CACHE_TTL_MARKS: int = 15 * 60
+    CACHE_TTL_SCHEDULE: int = 6 * 60 * 60
+    # Expired responses are kept this long to be served while "Моя школа" is unavailable
+    CACHE_STALE_TTL: int = 7 * 24 * 60 * 60
+
+    # Stored homework weeks are kept this long after their last fetch, expired ones are evicted
+    # by the sweeper in batches every interval (seconds)
+    HOMEWORK_RETENTION: int = 7 * 24 * 60 * 60
+    SWEEP_INTERVAL: int = 60 * 60
+    SWEEP_BATCH_SIZE: int = 500
+
+    # Rendered texts of the views, by the content hash of their data
+    RENDER_CACHE_SIZE: int = 4096
+
+    # Cache warming before the peaks, windows are "HH:MM-HH:MM" of the local time
+    PREFETCH_WINDOWS: list[str] = ['06:00-06:50', '14:00-14:50']
+    PREFETCH_CONCURRENCY: int = 4
+    PREFETCH_JITTER: float = 2.0
+    PREFETCH_WEEKS: int = 2
+
+    # Student and person IDs resolved by token
+    IDENTITY_CACHE_SIZE: int = 10_000
+    IDENTITY_CACHE_TTL: int = 24 * 60 * 60
+
+    # Users kept in memory between updates
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL: int = 30 * 60
+
+    # Push notifications about new homework
+    NOTIFY_HOURS: str = '08:00-20:00'
+    NOTIFY_CHECK_INTERVAL: int = 20 * 60
+    NOTIFY_QUEUE_SIZE: int = 1000
+    NOTIFY_GLOBAL_RATE: float = 25
+    NOTIFY_CHAT_INTERVAL: float = 1
+
+    # Local endpoint with the metrics in the Prometheus text format, 0 turns it off
+    METRICS_HOST: str = '127.0.0.1'
+    METRICS_PORT: int = 9100
+
+    # Share of the updates which are traced, 0 turns the tracing off
+    TRACE_SAMPLE_RATE: float = 0.0
+    # Traces in the Chrome trace event format
+    TRACE_FILE: str = 'temp/trace.json'
+
     @property
     def DB_URL(self) -> str:  # noqa: N802
         return f'sqlite+aiosqlite:///{self.DB_PATH}'
@@ -3,6 +3,7 @@ import json
 from aiogram import F, Router
 from aiogram.filters import Command, or_f
 
+from bot.config import config
 from bot.until import logger, main_button, make_debug_button
 from database import DataBaseCrud
 
@@ -68,7 +69,8 @@ async def sql_request(message, command):
 
 @debug_router.message(F.text, Command('logfile'))
 async def logfile(message):
-    with open('temp/log.log', 'r', encoding='utf-8') as logfile:
+    # A worker process writes its own log file, it's set in its config
+    with open(config.LOG_FILE, 'r', encoding='utf-8') as logfile:
         await message.answer('\n'.join(logfile.readlines()))
 
 
@@ -4,9 +4,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
 from bot.until import main_button, token_button
-from database import DataBaseCrud
 
-db = DataBaseCrud()
 auth_router = Router()
 
 
@@ -29,9 +27,7 @@ async def end_registration(message, user, state: FSMContext):
     if message.text.strip().startswith('eyJhb'):
         await state.update_data(token=message.text)
         data = await state.get_data()
-        user.token = data.get('token')
-        user.student_id = user.parser.get_student_id()
-        await db.update_user(user, ('token', 'student_id'))
+        await user.save_token(data.get('token'))
         await message.answer(
             f'{user.username}, ваш токен успешно зарегистрирован!',
             reply_markup=main_button(user),
@@ -3,9 +3,7 @@ from aiogram.types import Message
 
 from bot.classes import UserClass
 from bot.until import logger, main_button, make_setting_button
-from database import DataBaseCrud
 
-db = DataBaseCrud()
 settings_router = Router()
 
 
@@ -110,5 +108,5 @@ async def delete_user(message: Message, user: UserClass):
         user (UserClass): User object
     """
     logger.debug(f'The account has been deleted ({message.from_user.username})')
-    await db.delete_user(user.userid)
+    await user.delete()
     await message.answer('Аккаунт успешно удален!')
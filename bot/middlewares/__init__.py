@@ -1,5 +1,13 @@
-__all__ = ('UserMiddleware', 'LogMiddleware', 'TokenMiddleware')
+__all__ = (
+    'UserMiddleware',
+    'LogMiddleware',
+    'MetricsMiddleware',
+    'TokenMiddleware',
+    'TraceMiddleware',
+)
 
 from .log_middleware import LogMiddleware
+from .metrics_middleware import MetricsMiddleware
 from .token_middleware import TokenMiddleware
+from .trace_middleware import TraceMiddleware
 from .user_middleware import UserMiddleware
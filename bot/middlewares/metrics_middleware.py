@@ -0,0 +1,19 @@
+from typing import Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message
+
+from bot.until import metrics
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Middleware tracking the time, the errors and the flight of every handler by its name."""
+
+    async def __call__(self, handler: Callable, event: Message, data: dict):
+        with metrics.track(
+            metrics.handler_duration,
+            metrics.handler_errors,
+            metrics.handlers_in_flight,
+            data['handler'].callback.__name__,
+        ):
+            return await handler(event, data)
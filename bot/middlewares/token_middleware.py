@@ -1,10 +1,11 @@
 from aiogram import BaseMiddleware
 from aiogram.types import Message
 
-from bot.until import logger
+from bot.until import logger, tracer
 
 
 class TokenMiddleware(BaseMiddleware):
+    @tracer.traced
     async def __call__(self, handler, event: Message, data: dict):
         logger.debug('проверка токена')
         if data['user'].token is None:
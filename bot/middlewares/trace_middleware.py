@@ -0,0 +1,28 @@
+from typing import Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from bot.until import tracer
+
+
+class TraceMiddleware(BaseMiddleware):
+    """Middleware tracing the updates.
+
+    As an outer middleware of updates it starts a trace of every sampled update, as a middleware
+    of messages it opens the span of the handler.
+    """
+
+    async def __call__(self, handler: Callable, event: TelegramObject, data: dict):
+        if isinstance(event, Update):
+            user = data.get('event_from_user')
+            with tracer.trace(
+                'update',
+                update_id=event.update_id,
+                user_id=user.id if user else None,
+                type=event.event_type,
+            ):
+                return await handler(event, data)
+
+        with tracer.span(f'handler {data["handler"].callback.__name__}'):
+            return await handler(event, data)
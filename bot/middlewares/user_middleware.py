@@ -2,11 +2,15 @@ from aiogram import BaseMiddleware
 from aiogram.types import Message
 
 from bot.classes import UserClass
+from bot.services import prefetcher
+from bot.until import tracer
 
 
 class UserMiddleware(BaseMiddleware):
     """Middleware for getting user."""
 
+    @tracer.traced
     async def __call__(self, handler, event: Message, data: dict):
         data['user'] = await UserClass.get_user(message=event)
+        prefetcher.touch(event.from_user.id)
         return await handler(event, data)
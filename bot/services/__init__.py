@@ -0,0 +1,18 @@
+__all__ = (
+    'HomeworkWatcher',
+    'MetricsServer',
+    'Prefetcher',
+    'Sweeper',
+    'WebhookServer',
+    'homework_watcher',
+    'metrics_server',
+    'prefetcher',
+    'sweeper',
+    'webhook_server',
+)
+
+from .homework_watcher import HomeworkWatcher, homework_watcher
+from .metrics_server import MetricsServer, metrics_server
+from .prefetcher import Prefetcher, prefetcher
+from .sweeper import Sweeper, sweeper
+from .webhook_server import WebhookServer, webhook_server
@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime, time, timedelta
+from typing import Optional
+
+from bot.classes import UserClass
+from bot.config import config
+from bot.until import BackgroundTask, logger
+from database import DataBaseCrud
+
+db = DataBaseCrud()
+
+
+class HomeworkWatcher:
+    """Checks the homework of the users who have notifications turned on.
+
+    Each check requests the weeks older than the check interval from "Моя школа", bypassing the
+    response cache, whose TTL is longer than the interval. New lessons are pushed to the users by
+    `UserClass.get_homework`. Classmates share one week, so a class costs one request.
+    """
+
+    def __init__(
+        self,
+        hours: str = config.NOTIFY_HOURS,
+        interval: int = config.NOTIFY_CHECK_INTERVAL,
+        concurrency: int = config.PREFETCH_CONCURRENCY,
+    ):
+        """Initializes the watcher.
+
+        Args:
+            hours (str): Time of the day when the checks are made as "HH:MM-HH:MM".
+            interval (int): Seconds between the checks.
+            concurrency (int): How many users are checked at the same time.
+        """
+        begin, end = hours.split('-')
+        self.begin = time.fromisoformat(begin)
+        self.end = time.fromisoformat(end)
+        self.interval = interval
+        self.concurrency = concurrency
+        # `(index, workers)` of the worker process, it checks only the users it handles
+        self.shard: Optional[tuple[int, int]] = None
+
+        self._task = BackgroundTask()
+
+    def start(self):
+        self._task.start(self._run)
+
+    async def stop(self):
+        await self._task.stop()
+
+    async def check(self):
+        users = [
+            UserClass.from_model(user)
+            for user in await db.get_users(self.shard)
+            if user.token and user.student_id and user.setting_notification
+        ]
+        max_age = timedelta(seconds=self.interval)
+        queue = iter(users)
+
+        async def worker():
+            for user in queue:
+                try:
+                    await user.get_homework(max_age=max_age, notify_self=True, refresh=True)
+                except Exception as e:
+                    logger.warning(f'Checking homework of {user.username} has failed: {e!r}')
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+    async def _run(self):
+        while True:
+            if self.begin <= datetime.now().time() <= self.end:
+                try:
+                    await self.check()
+                except Exception as e:
+                    logger.error(f'Checking homework has failed: {e!r}')
+            await asyncio.sleep(self.interval)
+
+
+homework_watcher = HomeworkWatcher()
@@ -0,0 +1,112 @@
+from typing import Optional
+
+from aiohttp import web
+
+from bot.classes import Parser, UserClass, notifier, renderer
+from bot.config import config
+from bot.until import Metrics, logger, metrics
+from bot.until.metrics import Gauge
+from database import fsm_storage
+from database.write_queue import user_writes
+
+from .sweeper import sweeper
+from .webhook_server import webhook_server
+
+
+def _collect_stats() -> dict[tuple, float]:
+    """Returns the counters the components already keep by `(component, stat)`."""
+    stats = {
+        'response_cache': Parser.cache.stats,
+        'single_flight': Parser.flights.stats,
+        'identities': Parser.identities.stats,
+        **{f'breaker:{host}': breaker.stats for host, breaker in Parser.breakers.items()},
+        'users': UserClass.cache.stats,
+        'renderer': renderer.cache.stats,
+        'notifier': {
+            'queued': len(notifier.queue),
+            'sent': notifier.queue.sent,
+            'dropped': notifier.queue.dropped,
+        },
+        'user_writes': {
+            'pending': len(user_writes),
+            'merged': user_writes.merged,
+            'written': user_writes.written,
+        },
+        'fsm_storage': fsm_storage.cache.stats
+        | {
+            'pending': len(fsm_storage),
+            'written': fsm_storage.written,
+        },
+        'sweeper': {'deleted': sweeper.deleted},
+        'webhook': {
+            'queued': len(webhook_server),
+            'received': webhook_server.received,
+            'rejected': webhook_server.rejected,
+        },
+    }
+    return {
+        (component, stat): value
+        for component, values in stats.items()
+        for stat, value in values.items()
+    }
+
+
+class MetricsServer:
+    """Serves the metrics on `GET /metrics` in the Prometheus text format for scraping."""
+
+    def __init__(
+        self,
+        registry: Metrics = metrics,
+        host: str = config.METRICS_HOST,
+        port: int = config.METRICS_PORT,
+    ):
+        """Initializes the server.
+
+        Args:
+            registry (Metrics): Metrics to serve.
+            host (str): Interface to listen on, the endpoint isn't meant to be public.
+            port (int): Port to listen on, 0 turns the server off.
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+
+        self._runner: Optional[web.AppRunner] = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.registry.render(),
+            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'},
+        )
+
+    async def start(self):
+        if self._runner is not None or not self.port:
+            return
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, self.host, self.port).start()
+        except OSError as e:
+            logger.error(f"The metrics endpoint hasn't started: {e!r}")
+            await runner.cleanup()
+            return
+        self._runner = runner
+        logger.info(f'Metrics are served on http://{self.host}:{self.port}/metrics')
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+metrics.add(
+    Gauge(
+        'bot_component_stats',
+        'Counters and sizes kept by the caches and queues of the bot.',
+        ('component', 'stat'),
+        collect=_collect_stats,
+    )
+)
+metrics_server = MetricsServer()
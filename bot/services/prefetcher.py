@@ -0,0 +1,115 @@
+import asyncio
+import random
+from datetime import datetime, time, timedelta
+from typing import Optional
+
+from bot.classes import UserClass
+from bot.config import config
+from bot.until import BackgroundTask, logger
+from database import DataBaseCrud, UserModel
+
+db = DataBaseCrud()
+
+
+class Prefetcher:
+    """Refreshes homework and schedule of the users before the peaks.
+
+    In every window users are refreshed in order of their last activity, by a bounded number of
+    workers with a random delay between requests. Users who weren't refreshed before the end of
+    the window are skipped until the next one.
+    """
+
+    def __init__(
+        self,
+        windows: list[str] = config.PREFETCH_WINDOWS,
+        concurrency: int = config.PREFETCH_CONCURRENCY,
+        jitter: float = config.PREFETCH_JITTER,
+        weeks: int = config.PREFETCH_WEEKS,
+    ):
+        """Initializes the prefetcher.
+
+        Args:
+            windows (list[str]): Windows of the local time as "HH:MM-HH:MM".
+            concurrency (int): How many users are refreshed at the same time.
+            jitter (float): Maximum random delay in seconds before refreshing a user.
+            weeks (int): How many weeks of homework from the current one are refreshed.
+        """
+        self.windows: list[tuple[time, time]] = [
+            (time.fromisoformat(begin), time.fromisoformat(end))
+            for begin, end in (window.split('-') for window in windows)
+        ]
+        self.concurrency = concurrency
+        self.jitter = jitter
+        self.weeks = weeks
+
+        self.last_seen: dict[int, datetime] = {}
+        # `(index, workers)` of the worker process, it refreshes only the users it handles
+        self.shard: Optional[tuple[int, int]] = None
+        self._task = BackgroundTask()
+
+    def touch(self, userid: int):
+        """Marks the user as active right now."""
+        self.last_seen[userid] = datetime.now()
+
+    def start(self):
+        if self.windows:
+            self._task.start(self._run)
+
+    async def stop(self):
+        await self._task.stop()
+
+    async def prefetch(self, deadline: datetime):
+        """Refreshes the data of all users with a token until the deadline."""
+        users = [user for user in await db.get_users(self.shard) if user.token and user.student_id]
+        users.sort(key=lambda user: self.last_seen.get(user.userid, datetime.min), reverse=True)
+        logger.info(f'Prefetching data of {len(users)} users until {deadline:%H:%M}')
+
+        # The workers take users from one iterator, so the most active ones go first
+        queue = iter(users)
+
+        async def worker():
+            for user in queue:
+                if datetime.now() >= deadline:
+                    return
+                await asyncio.sleep(random.uniform(0, self.jitter))
+                await self._refresh(user)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+    async def _refresh(self, user_model: UserModel):
+        user = UserClass.from_model(user_model)
+        try:
+            # All weeks are requested at once, the current one is then taken from the cache
+            now = datetime.now()
+            await user.parser.get_homework_range(now, now + timedelta(weeks=self.weeks - 1))
+            await user.get_homework()
+            await user.get_schedule()
+        except Exception as e:
+            logger.warning(f'Prefetching data of {user.username} has failed: {e!r}')
+
+    def _next_window(self, now: datetime) -> tuple[datetime, datetime]:
+        """Returns the current window or the nearest next one."""
+        candidates = []
+        for day in (now.date(), now.date() + timedelta(days=1)):
+            for begin, end in self.windows:
+                begin_at = datetime.combine(day, begin)
+                end_at = datetime.combine(day, end)
+                if end_at < begin_at:
+                    end_at += timedelta(days=1)
+                if end_at > now:
+                    candidates.append((max(begin_at, now), end_at))
+        return min(candidates)
+
+    async def _run(self):
+        while True:
+            begin, end = self._next_window(datetime.now())
+            await asyncio.sleep((begin - datetime.now()).total_seconds())
+            try:
+                await self.prefetch(end)
+            except Exception as e:
+                logger.error(f'Prefetching has failed: {e!r}')
+            # Don't start the same window again
+            await asyncio.sleep(max((end - datetime.now()).total_seconds(), 0))
+
+
+prefetcher = Prefetcher()
@@ -0,0 +1,69 @@
+import asyncio
+
+from bot.config import config
+from bot.until import BackgroundTask, logger
+from database import DataBaseCrud
+
+db = DataBaseCrud()
+
+
+class Sweeper:
+    """Evicts expired homework weeks and cached responses in the background.
+
+    Requests never delete anything, the expired rows are found by the index on `expires_at` and
+    deleted in batches, one transaction per batch, so the database isn't locked for long.
+    """
+
+    def __init__(
+        self,
+        interval: int = config.SWEEP_INTERVAL,
+        batch_size: int = config.SWEEP_BATCH_SIZE,
+    ):
+        """Initializes the sweeper.
+
+        Args:
+            interval (int): Seconds between the sweeps.
+            batch_size (int): Maximum number of weeks (and of responses) deleted by one batch.
+        """
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self._task = BackgroundTask()
+
+        self.deleted = 0
+
+    def start(self):
+        self._task.start(self._run)
+
+    async def stop(self):
+        await self._task.stop()
+
+    async def sweep(self) -> int:
+        """Deletes everything what has expired.
+
+        Returns:
+            Number of deleted rows
+        """
+        deleted = 0
+        while True:
+            batch = await db.delete_expired(self.batch_size)
+            deleted += batch
+            if batch < self.batch_size:
+                break
+            # Lets the handlers use the database between the batches
+            await asyncio.sleep(0)
+        self.deleted += deleted
+        if deleted:
+            logger.debug(f'{deleted} expired rows have been deleted')
+        return deleted
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f'Sweeping the database has failed: {e!r}')
+            await asyncio.sleep(self.interval)
+
+
+sweeper = Sweeper()
@@ -0,0 +1,145 @@
+import asyncio
+import secrets
+from hmac import compare_digest
+from typing import Any, Optional, Protocol
+
+from aiogram import Bot
+from aiogram.types import Update
+from aiohttp import web
+from pydantic import ValidationError
+
+from bot.config import config
+from bot.until import logger
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class UpdateFeeder(Protocol):
+    """`Dispatcher` or anything else taking the updates the same way."""
+
+    async def feed_update(self, bot: Bot, update: Update) -> Any: ...
+
+    def resolve_used_update_types(self) -> list[str]: ...
+
+
+class WebhookServer:
+    """Receives the updates from Telegram by a webhook instead of long polling.
+
+    A request is answered as soon as its update is queued, the updates are handled by a fixed
+    number of workers. When the queue is full the request is answered with 503 and Telegram
+    delivers the update again later, so a burst can't start an unbounded number of handlers.
+    """
+
+    def __init__(
+        self,
+        url: str = config.WEBHOOK_URL,
+        host: str = config.WEBHOOK_HOST,
+        port: int = config.WEBHOOK_PORT,
+        path: str = config.WEBHOOK_PATH,
+        secret: Optional[str] = config.WEBHOOK_SECRET,
+        queue_size: int = config.WEBHOOK_QUEUE_SIZE,
+        workers: int = config.WEBHOOK_WORKERS,
+        shutdown_timeout: float = config.WEBHOOK_SHUTDOWN_TIMEOUT,
+    ):
+        """Initializes the server.
+
+        Args:
+            url (str): Public HTTPS URL of the server, `path` is added to it.
+            host (str): Interface to listen on.
+            port (int): Port to listen on.
+            path (str): Path of the webhook.
+            secret (str, optional): Secret token Telegram sends with every update. A random one
+                is made if it isn't given.
+            queue_size (int): Maximum number of the updates waiting for a worker.
+            workers (int): Number of the updates handled at once.
+            shutdown_timeout (float): Seconds the queued updates are waited for on stop.
+        """
+        self.url = url.rstrip('/') + path
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret = secret or secrets.token_urlsafe(32)
+        self.workers = workers
+        self.shutdown_timeout = shutdown_timeout
+
+        self._queue: asyncio.Queue[Update] = asyncio.Queue(queue_size)
+        self._runner: Optional[web.AppRunner] = None
+        self._workers: list[asyncio.Task] = []
+
+        self.received = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if not compare_digest(request.headers.get(SECRET_HEADER, ''), self.secret):
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate_json(
+                await request.read(), context={'bot': request.app['bot']}
+            )
+        except ValidationError:
+            return web.Response(status=400)
+
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logger.warning(f'The update queue is full, the update {update.update_id} is rejected!')
+            return web.Response(status=503)
+        self.received += 1
+        return web.Response()
+
+    async def _work(self, bot: Bot, dp: UpdateFeeder):
+        while True:
+            update = await self._queue.get()
+            try:
+                await dp.feed_update(bot, update)
+            except Exception as e:
+                logger.error(f'Handling the update {update.update_id} has failed: {e!r}')
+            finally:
+                self._queue.task_done()
+
+    async def start(self, bot: Bot, dp: UpdateFeeder):
+        """Starts the workers and the server and sets the webhook of the bot."""
+        if self._runner is not None:
+            return
+        if not self.url.startswith('https://'):
+            raise ValueError('WEBHOOK_URL must be a public HTTPS URL')
+
+        self._workers = [asyncio.create_task(self._work(bot, dp)) for _ in range(self.workers)]
+
+        app = web.Application()
+        app['bot'] = bot
+        app.router.add_post(self.path, self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+        await bot.set_webhook(
+            self.url,
+            secret_token=self.secret,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=min(self.workers, 100),
+        )
+        logger.info(f'Webhook is served on {self.host}:{self.port}{self.path}')
+
+    async def stop(self):
+        """Stops taking updates, waits for the queued ones and stops the workers."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+        try:
+            await asyncio.wait_for(self._queue.join(), self.shutdown_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f'{len(self)} queued updates have been dropped on shutdown!')
+
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+webhook_server = WebhookServer()
@@ -0,0 +1,245 @@
+"""Offline benchmark suite of parsing, rendering and database code.
+
+The upstream responses are taken from `bot/tests/fixtures` (small, typical and huge weeks), the
+results are written as JSON and can be compared with a stored baseline:
+
+    python -m bot.tests.benchmark --output benchmark.json
+    python -m bot.tests.benchmark --baseline benchmark.json --threshold 0.2
+
+The comparison exits with code 1 if any benchmark is slower than the baseline by more than the
+threshold.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from bot.classes import HomeworkWeek, MarksWeek, Renderer, ScheduleWeek, UserClass
+from database import DataBaseCrud, UserModel, UserWriteQueue
+from database.database import make_engine
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+SIZES = ('small', 'typical', 'huge')
+MONDAY = datetime(2025, 1, 13)
+FRIDAY = MONDAY + timedelta(days=4)
+
+
+def load(name: str, size: str) -> bytes:
+    return (FIXTURES / f'{name}_{size}.json').read_bytes()
+
+
+def bench(func: Callable[[], Any], repeat: int) -> dict[str, float]:
+    """Times the function, the number of calls per sample is chosen to take at least 10 ms.
+
+    Returns:
+        Median, minimum and maximum of a call in microseconds
+    """
+    number = 1
+    while True:
+        start = perf_counter()
+        for _ in range(number):
+            func()
+        if perf_counter() - start >= 0.01:
+            break
+        number *= 2
+
+    samples = []
+    for _ in range(repeat):
+        start = perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((perf_counter() - start) / number * 1e6)
+    return {
+        'median_us': statistics.median(samples),
+        'min_us': min(samples),
+        'max_us': max(samples),
+    }
+
+
+async def bench_async(func: Callable[[], Awaitable[Any]], repeat: int) -> dict[str, float]:
+    """Times the coroutine function, every sample is one call."""
+    await func()  # warm up
+    samples = []
+    for _ in range(repeat):
+        start = perf_counter()
+        await func()
+        samples.append((perf_counter() - start) * 1e6)
+    return {
+        'median_us': statistics.median(samples),
+        'min_us': min(samples),
+        'max_us': max(samples),
+    }
+
+
+def bench_parsing(results: dict, repeat: int):
+    for size in SIZES:
+        homeworks, marks, events = (
+            load('homeworks', size),
+            load('marks', size),
+            load('events', size),
+        )
+        results[f'parse.homework.{size}'] = bench(
+            lambda: HomeworkWeek(0, MONDAY, FRIDAY, homeworks), repeat
+        )
+        results[f'parse.marks.{size}'] = bench(lambda: MarksWeek(MONDAY, FRIDAY, marks), repeat)
+        results[f'parse.schedule.{size}'] = bench(
+            lambda: ScheduleWeek(MONDAY, FRIDAY, events), repeat
+        )
+
+
+def bench_rendering(results: dict, repeat: int):
+    for size in SIZES:
+        week = HomeworkWeek(0, MONDAY, FRIDAY, load('homeworks', size))
+        marks = MarksWeek(MONDAY, FRIDAY, load('marks', size))
+        schedule = ScheduleWeek(MONDAY, FRIDAY, load('events', size))
+
+        # A new renderer every call, so nothing comes from its cache
+        results[f'render.homework.{size}'] = bench(
+            lambda: Renderer(1).homework(week, True, True, 0), repeat
+        )
+        results[f'render.marks.{size}'] = bench(
+            lambda: Renderer(1).marks(marks, True, 'Понедельник'), repeat
+        )
+        results[f'render.schedule.{size}'] = bench(
+            lambda: Renderer(1).schedule(schedule, True), repeat
+        )
+
+        renderer = Renderer(8)
+        results[f'render.homework_cached.{size}'] = bench(
+            lambda: renderer.homework(week, True, True, 0), repeat
+        )
+
+
+def bench_serialization(results: dict, repeat: int):
+    for size in SIZES:
+        week = HomeworkWeek(0, MONDAY, FRIDAY, load('homeworks', size))
+        model = week.to_model()
+        model.id = 1
+        results[f'serialize.homework_to_model.{size}'] = bench(week.to_model, repeat)
+
+        def from_model():
+            HomeworkWeek.built.clear()
+            HomeworkWeek.from_model(model)
+
+        results[f'serialize.homework_from_model.{size}'] = bench(from_model, repeat)
+
+    user = UserClass(1, 'user', token='token', student_id=1, person_id='1')
+    results['serialize.user_round_trip'] = bench(
+        lambda: UserClass.from_model(user.to_model()), repeat
+    )
+
+
+async def bench_database(results: dict, repeat: int):
+    path = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    engine = make_engine(f'sqlite+aiosqlite:///{path}')
+    session_maker = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    db = DataBaseCrud(engine, session_maker, UserWriteQueue(session_maker, delay=3600))
+    await db.create_tables()
+
+    userid = 0
+
+    async def add_user():
+        nonlocal userid
+        userid += 1
+        await db.add_user(UserClass(userid, f'user{userid}').to_model())
+        await db.writes.flush()
+
+    results['db.add_user'] = await bench_async(add_user, repeat)
+    results['db.get_user'] = await bench_async(lambda: db.get_user(1), repeat)
+    await db.update_user(UserModel(userid=1, username='user1', setting_dw=True), ('setting_dw',))
+    results['db.update_user'] = await bench_async(
+        lambda: db.update_user(
+            UserModel(userid=1, username='user1', setting_dw=True), ('setting_dw',)
+        ),
+        repeat,
+    )
+    await db.writes.flush()
+
+    for size in SIZES:
+        raw = load('homeworks', size)
+        number = 0
+
+        async def add_homework():
+            # Every week is new, so it's inserted with its days and lessons
+            nonlocal number
+            number += 1
+            monday = MONDAY + timedelta(weeks=number)
+            week = HomeworkWeek(0, monday, monday + timedelta(days=4), raw)
+            await db.add_homework(1, week.to_model())
+
+        results[f'db.add_homework.{size}'] = await bench_async(add_homework, repeat)
+        results[f'db.get_homework.{size}'] = await bench_async(
+            lambda: db.get_homework(1, max_age=None), repeat
+        )
+
+    await db.close()
+    await engine.dispose()
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Returns the descriptions of the benchmarks slower than the baseline by the threshold."""
+    regressions = []
+    for name, result in results.items():
+        if (base := baseline.get(name)) is None:
+            continue
+        ratio = result['median_us'] / base['median_us']
+        if ratio > 1 + threshold:
+            regressions.append(
+                f'{name}: {base["median_us"]:.1f} -> {result["median_us"]:.1f} µs ({ratio:.2f}x)'
+            )
+    return regressions
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=15, help='samples per benchmark')
+    parser.add_argument('--output', type=Path, help='file for the results')
+    parser.add_argument('--baseline', type=Path, help='results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown')
+    parser.add_argument('--skip-db', action='store_true', help="don't run database benchmarks")
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, float]] = {}
+    bench_parsing(results, args.repeat)
+    bench_rendering(results, args.repeat)
+    bench_serialization(results, args.repeat)
+    if not args.skip_db:
+        await bench_database(results, args.repeat)
+
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text, encoding='utf-8')
+    else:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))['results']
+        if regressions := compare(results, baseline, args.threshold):
+            print('Regressions:', *regressions, sep='\n', file=sys.stderr)
+            return 1
+        print('No regressions', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import patch
+
+from bot.until import CircuitBreaker, ExpiredTokenError, UnavailableError
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        patcher = patch('bot.until.circuit_breaker.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(threshold=3, reset_timeout=30)
+
+    def call(self, error: type[BaseException] | None = None):
+        with self.breaker.guard():
+            if error is not None:
+                raise error
+
+    def open(self):
+        for _ in range(self.breaker.threshold):
+            with self.assertRaises(UnavailableError):
+                self.call(UnavailableError)
+
+    def test_opens_after_failures_in_a_row(self):
+        self.open()
+        self.assertEqual(self.breaker.state, 'open')
+        with self.assertRaises(UnavailableError):
+            self.call()
+        self.assertEqual(self.breaker.rejected, 1)
+
+    def test_success_resets_the_failures(self):
+        for _ in range(self.breaker.threshold - 1):
+            with self.assertRaises(UnavailableError):
+                self.call(UnavailableError)
+        self.call()
+        with self.assertRaises(UnavailableError):
+            self.call(UnavailableError)
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_other_errors_prove_the_server_is_up(self):
+        self.open()
+        self.now = 30
+        with self.assertRaises(ExpiredTokenError):
+            self.call(ExpiredTokenError)
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_successful_probe_closes(self):
+        self.open()
+        self.now = 30
+        self.breaker.before()
+        self.assertEqual(self.breaker.state, 'half_open')
+        # Only one probe at a time
+        with self.assertRaises(UnavailableError):
+            self.breaker.before()
+        self.breaker.success()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.call()
+
+    def test_failed_probe_opens_again(self):
+        self.open()
+        self.now = 30
+        with self.assertRaises(UnavailableError):
+            self.call(UnavailableError)
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertEqual(self.breaker.opens, 2)
+        self.now = 59
+        with self.assertRaises(UnavailableError):
+            self.call()
+
+    def test_cancelled_probe_lets_the_next_one_through(self):
+        self.open()
+        self.now = 30
+        with self.assertRaises(KeyboardInterrupt):
+            self.call(KeyboardInterrupt)
+        self.assertEqual(self.breaker.state, 'half_open')
+        self.call()
+        self.assertEqual(self.breaker.state, 'closed')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from contextlib import closing
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database import DataBaseCrud, UserWriteQueue
+from database.database import make_engine
+
+
+class DatabaseTestCase(unittest.IsolatedAsyncioTestCase):
+    """Runs every test against a new database file, which is removed after the test."""
+
+    # SQL script run on the file before the tables are created, e.g. an old schema to migrate
+    initial_schema = ''
+
+    async def asyncSetUp(self):
+        directory = tempfile.TemporaryDirectory()
+        # Cleanups run in reverse order, so the file is removed after the engine is disposed
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'test.db')
+        if self.initial_schema:
+            with closing(sqlite3.connect(self.path)) as conn:
+                conn.executescript(self.initial_schema)
+        self.engine = make_engine(f'sqlite+aiosqlite:///{self.path}')
+        self.addAsyncCleanup(self.engine.dispose)
+        self.session_maker = async_sessionmaker(
+            self.engine, autoflush=False, expire_on_commit=False
+        )
+        # The tests flush the writes themselves
+        self.writes = UserWriteQueue(self.session_maker, delay=3600)
+        self.db = DataBaseCrud(self.engine, self.session_maker, self.writes)
+        self.addAsyncCleanup(self.db.close)
+        await self.db.create_tables()
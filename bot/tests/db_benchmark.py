@@ -0,0 +1,140 @@
+"""Throughput of the `DataBaseCrud` operations under concurrent load.
+
+Every profile is run against a new database file, so the results can be compared:
+
+    python -m bot.tests.db_benchmark --users 500 --concurrency 50
+
+The "default" profile keeps the SQLite defaults (rollback journal, full sync), the "tuned" one
+applies `database.PRAGMAS` from the config.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Awaitable, Callable
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from bot.classes import HomeworkWeek
+from database import DataBaseCrud, UserModel, UserWriteQueue
+from database.database import PRAGMAS, make_engine
+
+PROFILES = {'default': {}, 'tuned': PRAGMAS}
+
+
+def make_week(number: int) -> HomeworkWeek:
+    monday = datetime(2025, 1, 6)
+    response = {
+        'payload': [
+            {
+                'date': (monday + timedelta(days=day)).strftime('%Y-%m-%d'),
+                'subject_name': f'Subject {lesson}',
+                'homework': f'Task {number}.{day}.{lesson}',
+                'additional_materials': [],
+            }
+            for day in range(5)
+            for lesson in range(6)
+        ]
+    }
+    return HomeworkWeek(number, monday, monday + timedelta(days=4), json.dumps(response).encode())
+
+
+async def run_concurrently(
+    jobs: list[Callable[[], Awaitable]], concurrency: int
+) -> tuple[float, int]:
+    """Runs the jobs by `concurrency` workers.
+
+    Returns:
+        Operations per second and the number of failed operations
+    """
+    jobs_iter = iter(jobs)
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for job in jobs_iter:
+            try:
+                await job()
+            except OperationalError:  # "database is locked"
+                errors += 1
+
+    start = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(jobs) / (perf_counter() - start), errors
+
+
+async def bench_profile(name: str, users: int, concurrency: int) -> dict[str, tuple[float, int]]:
+    path = os.path.join(tempfile.mkdtemp(), f'{name}.db')
+    engine = make_engine(f'sqlite+aiosqlite:///{path}', PROFILES[name])
+    session_maker = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    # The queue is flushed by the benchmark, so every write reaches the database immediately
+    db = DataBaseCrud(engine, session_maker, UserWriteQueue(session_maker, delay=3600))
+    await db.create_tables()
+
+    async def add_user(userid: int):
+        await db.add_user(
+            UserModel(
+                userid=userid,
+                username=f'user{userid}',
+                debug=False,
+                setting_dw=False,
+                setting_notification=True,
+                setting_hide_link=True,
+                token='token',
+            )
+        )
+        await db.writes.flush()
+
+    async def update_user(userid: int):
+        user = UserModel(userid=userid, username=f'user{userid}', setting_dw=bool(userid % 2))
+        await db.update_user(user, ('setting_dw',))
+        await db.writes.flush()
+
+    weeks = [make_week(i).to_model for i in range(max(1, users // 25))]
+    results = {
+        'add_user': await run_concurrently(
+            [lambda i=i: add_user(i) for i in range(users)], concurrency
+        ),
+        'get_user': await run_concurrently(
+            [lambda i=i: db.get_user(i) for i in range(users)], concurrency
+        ),
+        'update_user': await run_concurrently(
+            [lambda i=i: update_user(i) for i in range(users)], concurrency
+        ),
+        # Every class of 25 students shares a week
+        'add_homework': await run_concurrently(
+            [lambda i=i: db.add_homework(i, weeks[i % len(weeks)]()) for i in range(users)],
+            concurrency,
+        ),
+        'get_homework': await run_concurrently(
+            [lambda i=i: db.get_homework(i, max_age=None) for i in range(users)], concurrency
+        ),
+    }
+    await db.close()
+    await engine.dispose()
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--profile', choices=[*PROFILES, 'all'], default='all')
+    args = parser.parse_args()
+
+    profiles = list(PROFILES) if args.profile == 'all' else [args.profile]
+    print(f'{"profile":<10}{"operation":<15}{"ops/s":>10}{"errors":>8}')
+    for name in profiles:
+        for operation, (rate, errors) in (
+            await bench_profile(name, args.users, args.concurrency)
+        ).items():
+            print(f'{name:<10}{operation:<15}{rate:>10.1f}{errors:>8}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
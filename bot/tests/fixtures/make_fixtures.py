@@ -0,0 +1,141 @@
+"""Generates the fixtures of the benchmark suite.
+
+The fixtures are synthetic: they follow the schema of the "Моя школа" API responses, but no
+real response was recorded. The generation is seeded, so the files are always the same:
+
+    python -m bot.tests.fixtures.make_fixtures
+"""
+
+import json
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+FIXTURES = Path(__file__).parent
+MONDAY = date(2025, 1, 13)
+# Lessons per day, links per lesson and length of a homework text of every size
+SIZES = {'small': (2, 0, 20), 'typical': (6, 1, 80), 'huge': (9, 4, 600)}
+SUBJECTS = [
+    'Алгебра',
+    'Геометрия',
+    'Русский язык',
+    'Литература',
+    'Физика',
+    'Химия',
+    'Биология',
+    'История',
+    'Английский язык',
+    'Информатика',
+]
+WORDS = 'стр упр номер параграф прочитать выучить решить задачи вопросы таблица конспект'.split()
+
+
+def text(rnd: random.Random, length: int) -> str:
+    words = []
+    while sum(map(len, words)) + len(words) < length:
+        words.append(rnd.choice(WORDS) if rnd.random() > 0.2 else str(rnd.randint(1, 400)))
+    return ' '.join(words)
+
+
+def material(rnd: random.Random, number: int) -> dict:
+    if rnd.random() < 0.5:
+        title = f'file_{number}.{rnd.choice(["png", "jpg", "docx", "pptx"])}'
+    else:
+        title = f'Материал {number}'
+    return {
+        'type': 'attachments',
+        'items': [
+            {
+                'title': title,
+                'link': f'https://example.org/files/{number}',
+                'uuid': f'00000000-0000-0000-0000-{number:012d}',
+                'urls': [
+                    {'url_type': kind, 'url': f'https://example.org/{kind}/{number}'}
+                    for kind in ('preview', 'download', 'view')
+                ],
+            }
+        ],
+    }
+
+
+def homeworks(rnd: random.Random, lessons: int, links: int, length: int) -> dict:
+    payload = []
+    for day in range(5):
+        for lesson in range(lessons):
+            number = len(payload)
+            payload.append(
+                {
+                    'id': 100000 + number,
+                    'type': 'homework',
+                    'date': (MONDAY + timedelta(days=day)).isoformat(),
+                    'date_assigned_on': (MONDAY + timedelta(days=day - 2)).isoformat(),
+                    'subject_id': 1000 + lesson,
+                    'subject_name': SUBJECTS[(day + lesson) % len(SUBJECTS)],
+                    'homework': text(rnd, length) if rnd.random() > 0.1 else 'не задано',
+                    'homework_entry_id': 500000 + number,
+                    'homework_created_at': f'{MONDAY.isoformat()}T10:00:00',
+                    'homework_updated_at': f'{MONDAY.isoformat()}T10:00:00',
+                    'is_done': False,
+                    'additional_materials': [
+                        material(rnd, number * 10 + i) for i in range(rnd.randint(0, links))
+                    ],
+                }
+            )
+    return {'payload': payload}
+
+
+def marks(rnd: random.Random, lessons: int, links: int, length: int) -> dict:
+    payload = [
+        {
+            'id': 200000 + day * 10 + lesson,
+            'date': (MONDAY + timedelta(days=day)).isoformat(),
+            'subject_id': 1000 + lesson,
+            'subject_name': SUBJECTS[(day + lesson) % len(SUBJECTS)],
+            'value': str(rnd.randint(2, 5)),
+            'weight': rnd.randint(1, 3),
+            'control_form_name': 'Ответ на уроке',
+            'comment': text(rnd, length // 4),
+            'is_exam': False,
+            'is_point': False,
+        }
+        for day in range(5)
+        for lesson in range(lessons)
+        if rnd.random() < 0.4
+    ]
+    return {'payload': payload}
+
+
+def events(rnd: random.Random, lessons: int, links: int, length: int) -> dict:
+    response = []
+    for day in range(5):
+        for lesson in range(lessons):
+            start = f'{(MONDAY + timedelta(days=day)).isoformat()}T{8 + lesson:02d}:00:00+03:00'
+            response.append(
+                {
+                    'id': 300000 + len(response),
+                    'source': 'PLAN',
+                    'start_at': start,
+                    'finish_at': start.replace(':00:00', ':45:00'),
+                    'subject_id': 1000 + lesson,
+                    'subject_name': SUBJECTS[(day + lesson) % len(SUBJECTS)],
+                    'room_number': str(rnd.randint(100, 350)),
+                    'room_name': 'Кабинет',
+                    'lesson_theme': text(rnd, length // 4),
+                    'replaced': False,
+                    'cancelled': False,
+                }
+            )
+    return {'total_count': len(response), 'response': response}
+
+
+def main():
+    for name, make in (('homeworks', homeworks), ('marks', marks), ('events', events)):
+        for size, params in SIZES.items():
+            data = make(random.Random(f'{name}-{size}'), *params)
+            (FIXTURES / f'{name}_{size}.json').write_text(
+                json.dumps(data, ensure_ascii=False, indent=1), encoding='utf-8'
+            )
+
+
+if __name__ == '__main__':
+    main()
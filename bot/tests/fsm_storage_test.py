@@ -0,0 +1,50 @@
+import unittest
+
+from aiogram.fsm.storage.base import StorageKey
+
+from bot.tests.database_case import DatabaseTestCase
+from database import FSMStateModel, SQLiteStorage
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=2)
+
+
+class SQLiteStorageTest(DatabaseTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.storage = SQLiteStorage(self.session_maker, delay=3600)
+        self.addAsyncCleanup(self.storage.close)
+
+    async def get_row(self) -> FSMStateModel | None:
+        async with self.session_maker() as session:
+            return await session.get(FSMStateModel, self.storage.key_builder.build(KEY))
+
+    async def test_state_survives_a_restart(self):
+        await self.storage.set_state(KEY, 'Form:name')
+        await self.storage.set_data(KEY, {'name': 'Иван'})
+        self.assertEqual(len(self.storage), 1)
+        await self.storage.close()
+
+        restarted = SQLiteStorage(self.session_maker, delay=3600)
+        self.assertEqual(await restarted.get_state(KEY), 'Form:name')
+        self.assertEqual(await restarted.get_data(KEY), {'name': 'Иван'})
+        await restarted.close()
+
+    async def test_state_cleared_before_the_write_isnt_written(self):
+        await self.storage.set_state(KEY, 'Form:name')
+        await self.storage.set_state(KEY, None)
+        await self.storage.flush()
+        self.assertIsNone(await self.get_row())
+        self.assertIsNone(await self.storage.get_state(KEY))
+
+    async def test_cleared_state_is_deleted(self):
+        await self.storage.set_state(KEY, 'Form:name')
+        await self.storage.flush()
+        self.assertIsNotNone(await self.get_row())
+
+        await self.storage.set_state(KEY, None)
+        await self.storage.flush()
+        self.assertIsNone(await self.get_row())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""Memory and construction speed of the homework objects against the former pydantic ones.
+
+python -m bot.tests.homework_benchmark --weeks 2000
+"""
+
+import argparse
+import gc
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Callable, Iterator
+
+from pydantic import BaseModel, Field
+
+from bot.classes import HomeworkWeek, Lesson, LinkInfo, StudyDay
+from database import LessonModel, StudyDayModel
+
+PydanticLinkInfo = namedtuple('PydanticLinkInfo', ['name', 'link'])
+
+
+# The representation used before the slotted classes
+class PydanticLesson(BaseModel):
+    name: str
+    homework: str = Field(frozen=True)
+    links: list[PydanticLinkInfo] = Field(examples=[PydanticLinkInfo('name', 'link')])
+    model: type = LessonModel
+
+
+class PydanticStudyDay(BaseModel):
+    name: str
+    date: datetime = Field(frozen=True)
+    lessons: list[PydanticLesson]
+    model: type = StudyDayModel
+
+    def __iter__(self) -> Iterator[PydanticLesson]:  # pyright: ignore[reportIncompatibleMethodOverride]
+        return iter(self.lessons)
+
+
+class PydanticWeek:
+    def __init__(self, days: list[PydanticStudyDay]):
+        self.model = None
+        self.days = days
+
+
+def week_data(number: int) -> list[tuple[str, datetime, list[tuple[str, str, list]]]]:
+    """Six lessons a day, every third one has a link."""
+    monday = datetime(2025, 1, 6)
+    return [
+        (
+            f'Day {day}',
+            monday + timedelta(days=day),
+            [
+                (
+                    f'Subject {lesson}',
+                    f'Task {number}.{day}.{lesson}',
+                    [(f'file{lesson}.pdf', f'https://example.com/{number}/{day}/{lesson}')]
+                    if lesson % 3 == 0
+                    else [],
+                )
+                for lesson in range(6)
+            ],
+        )
+        for day in range(5)
+    ]
+
+
+def build_slotted(data) -> HomeworkWeek:
+    return HomeworkWeek(
+        0,
+        data[0][1],
+        data[-1][1],
+        days=[
+            StudyDay(
+                name,
+                date,
+                [Lesson(n, hw, [LinkInfo(*link) for link in links]) for n, hw, links in lessons],
+            )
+            for name, date, lessons in data
+        ],
+    )
+
+
+def build_pydantic(data) -> PydanticWeek:
+    return PydanticWeek(
+        [
+            PydanticStudyDay(
+                name=name,
+                date=date,
+                lessons=[
+                    PydanticLesson(
+                        name=n, homework=hw, links=[PydanticLinkInfo(*link) for link in links]
+                    )
+                    for n, hw, links in lessons
+                ],
+            )
+            for name, date, lessons in data
+        ]
+    )
+
+
+def measure(build: Callable, data: list) -> tuple[float, float]:
+    """Builds a week from every item of the data.
+
+    Returns:
+        Microseconds per week and KiB per week
+    """
+    gc.collect()
+    start = perf_counter()
+    weeks = [build(item) for item in data]
+    elapsed = perf_counter() - start
+    del weeks
+
+    # Tracing slows down the construction, so the memory is measured by another run
+    gc.collect()
+    tracemalloc.start()
+    weeks = [build(item) for item in data]
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del weeks
+    return elapsed / len(data) * 1e6, memory / len(data) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--weeks', type=int, default=2000)
+    args = parser.parse_args()
+
+    data = [week_data(i) for i in range(args.weeks)]
+    print(f'{"representation":<16}{"µs/week":>10}{"KiB/week":>10}')
+    for name, build in (('pydantic', build_pydantic), ('slotted', build_slotted)):
+        speed, memory = measure(build, data)
+        print(f'{name:<16}{speed:>10.1f}{memory:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
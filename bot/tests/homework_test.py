@@ -0,0 +1,86 @@
+import json
+import unittest
+from datetime import datetime, timedelta
+
+from bot.classes import HomeworkWeek, LinkInfo
+from bot.tests.database_case import DatabaseTestCase
+from database import UserModel
+
+MONDAY = datetime(2025, 1, 13)
+
+
+def make_week(*lessons: tuple[int, str, str], student_id: int = 1) -> HomeworkWeek:
+    """Makes the week from `(day, subject, homework)` of its lessons, 0 is Monday."""
+    response = {
+        'payload': [
+            {
+                'date': (MONDAY + timedelta(days=day)).strftime('%Y-%m-%d'),
+                'subject_name': subject,
+                'homework': homework,
+                'additional_materials': [],
+            }
+            for day, subject, homework in lessons
+        ]
+    }
+    return HomeworkWeek(
+        student_id, MONDAY, MONDAY + timedelta(days=4), json.dumps(response).encode()
+    )
+
+
+class HomeworkDiffTest(unittest.TestCase):
+    def test_new_and_changed_lessons_are_found(self):
+        old = make_week((0, 'Math', 'p. 1'), (2, 'Physics', 'p. 5'))
+        new = make_week((0, 'Math', 'p. 1'), (0, 'History', 'p. 3'), (2, 'Physics', 'p. 6'))
+        changes = [
+            (day.name, [lesson.homework for lesson in lessons]) for day, lessons in new.diff(old)
+        ]
+        self.assertEqual(changes, [('Понедельник', ['p. 3']), ('Среда', ['p. 6'])])
+
+    def test_same_week_has_no_changes(self):
+        week = make_week((0, 'Math', 'p. 1'))
+        self.assertEqual(week.diff(make_week((0, 'Math', 'p. 1'))), [])
+
+    def test_removed_lessons_arent_changes(self):
+        old = make_week((0, 'Math', 'p. 1'), (1, 'Physics', 'p. 5'))
+        self.assertEqual(make_week((0, 'Math', 'p. 1')).diff(old), [])
+
+    def test_links_are_compared(self):
+        old = make_week((0, 'Math', 'p. 1'))
+        new = make_week((0, 'Math', 'p. 1'))
+        new[0].lessons[0].links.append(LinkInfo('task.png', 'https://example.com/task.png'))
+        self.assertEqual(len(new.diff(old)), 1)
+
+
+class AddHomeworkTest(DatabaseTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        for userid in (1, 2):
+            await self.db.add_user(UserModel(userid=userid, username=f'user{userid}'))
+        await self.writes.flush()
+
+    async def lessons(self, userid: int) -> list[tuple[str, str]]:
+        week = HomeworkWeek.from_model(await self.db.get_homework(userid, max_age=None))
+        assert week is not None
+        return [(lesson.name, lesson.homework) for day in week for lesson in day]
+
+    async def test_classmates_are_moved_to_the_new_content(self):
+        await self.db.add_homework(1, make_week((0, 'Math', 'p. 1')).to_model())
+        await self.db.add_homework(2, make_week((0, 'Math', 'p. 1')).to_model())
+
+        await self.db.add_homework(1, make_week((0, 'Math', 'p. 2')).to_model())
+        self.assertEqual(await self.lessons(2), [('Math', 'p. 2')])
+
+    async def test_users_of_an_empty_week_arent_grouped(self):
+        # Every class without homework has the same empty week
+        first = await self.db.add_homework(1, make_week().to_model())
+        second = await self.db.add_homework(2, make_week().to_model())
+        assert first is not None and second is not None
+        self.assertEqual(first[0], second[0])
+
+        await self.db.add_homework(1, make_week((0, 'Math', 'class A task')).to_model())
+        self.assertEqual(await self.lessons(1), [('Math', 'class A task')])
+        self.assertEqual(await self.lessons(2), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,285 @@
+"""Load generator driving the dispatcher of the bot with simulated users.
+
+Synthetic updates are fed to `dp` of `bot/bin/bot.py` through `dp.feed_update`, the Bot API calls
+are answered by a fake session and "Моя школа" is replaced by `bot/tests/mock_mosreg.py`, so
+neither Telegram nor authedu.mosreg.ru is touched. The database is a temporary file.
+
+    python -m bot.tests.load_generator --users 1000 --updates 10000 --concurrency 200
+    python -m bot.tests.load_generator --latency 0.1 --jitter 0.05 --error-rate 0.01
+
+Prints the throughput and p50/p95/p99 of the handling time of an update, overall and by command.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import sys
+import tempfile
+from collections import Counter, defaultdict
+from datetime import datetime
+from itertools import count
+from pathlib import Path
+from time import perf_counter
+from typing import Any, AsyncGenerator
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import Message, Update
+
+COMMANDS = {
+    'homework': 'Домашнее задание 📓',
+    'marks': 'Оценки 📝',
+    'schedule': 'Расписание 📅',
+}
+
+
+class FakeSession(BaseSession):
+    """Session answering every Bot API call locally, the calls are only counted."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls: Counter[str] = Counter()
+        self._message_ids = count(1)
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[Any], timeout: int | None = None
+    ) -> Any:
+        self.calls[type(method).__name__] += 1
+        if method.__returning__ is Message:
+            # Every method returning a message has chat_id, TelegramMethod itself doesn't
+            return Message.model_validate(
+                {
+                    'message_id': next(self._message_ids),
+                    'date': datetime.now(),
+                    'chat': {'id': getattr(method, 'chat_id'), 'type': 'private'},
+                    'text': getattr(method, 'text', None),
+                },
+                context={'bot': bot},
+            )
+        return True
+
+    async def stream_content(self, *args, **kwargs) -> AsyncGenerator[bytes, None]:
+        yield b''
+
+    async def close(self):
+        pass
+
+
+def make_update(bot: Bot, update_id: int, userid: int, text: str) -> Update:
+    """Makes the update of a private text message from the user."""
+    user = {
+        'id': userid,
+        'is_bot': False,
+        'first_name': f'user{userid}',
+        'username': f'user{userid}',
+    }
+    return Update.model_validate(
+        {
+            'update_id': update_id,
+            'message': {
+                'message_id': update_id,
+                'date': datetime.now(),
+                'chat': {'id': userid, 'type': 'private'},
+                'from': user,
+                'text': text,
+            },
+        },
+        context={'bot': bot},
+    )
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Returns the p-th percentile (nearest rank) of the sorted values."""
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)] if values else 0.0
+
+
+def summary(latencies: list[float]) -> dict[str, float]:
+    latencies = sorted(latencies)
+    return {
+        'count': len(latencies),
+        'p50_ms': percentile(latencies, 50) * 1e3,
+        'p95_ms': percentile(latencies, 95) * 1e3,
+        'p99_ms': percentile(latencies, 99) * 1e3,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1e3,
+    }
+
+
+async def start_mock(args: argparse.Namespace, port: int) -> asyncio.subprocess.Process:
+    """Starts the mock in its own process, so it doesn't share the event loop with the bot."""
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        '-m',
+        'bot.tests.mock_mosreg',
+        '--port',
+        str(port),
+        '--size',
+        args.size,
+        '--latency',
+        str(args.latency),
+        '--jitter',
+        str(args.jitter),
+        '--error-rate',
+        str(args.error_rate),
+        stdout=asyncio.subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+        except OSError:
+            await asyncio.sleep(0.1)
+            continue
+        writer.close()
+        return process
+    process.terminate()
+    raise RuntimeError('The mock of "Моя школа" has not started')
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def configure(args: argparse.Namespace) -> int | None:
+    """Points the bot to the mock and a temporary database, must be called before its import.
+
+    Returns:
+        Port of the mock to start, None if `--mock-url` is given.
+    """
+    port = None
+    if (url := args.mock_url) is None:
+        port = free_port()
+        url = f'http://127.0.0.1:{port}'
+    os.environ['AUTHEDU_URL'] = os.environ['MYSCHOOL_URL'] = url
+
+    directory = tempfile.mkdtemp()
+    os.environ['DB_PATH'] = os.path.join(directory, 'load.db')
+    os.environ['DB_BACKUP_PATH'] = os.path.join(directory, 'load_backup.db')
+    # The bot never reaches Telegram, the token only has to look valid
+    os.environ.setdefault('DEBUG_TOKEN', '42:LOAD_TEST')
+    os.environ.setdefault('RELEASE_TOKEN', '42:LOAD_TEST')
+    os.environ.setdefault('ADMIN_IDS', '[]')
+    os.makedirs('temp', exist_ok=True)  # for the log file of the bot
+    return port
+
+
+async def run(args: argparse.Namespace) -> dict:
+    port = configure(args)
+
+    from bot.bin.bot import bot, dp, setup_dispatcher
+    from bot.classes import Parser, UserClass
+    from bot.until import logger
+    from database import DataBaseCrud
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    mock = await start_mock(args, port) if port is not None else None
+    db = DataBaseCrud()
+    session = FakeSession()
+    bot.session = session
+    try:
+        setup_dispatcher()
+        await db.create_tables()
+        for userid in range(1, args.users + 1):
+            await db.add_user(
+                UserClass(userid, f'user{userid}', token=f'token-{userid}').to_model()
+            )
+        await db.writes.flush()
+
+        rnd = random.Random(args.seed)
+        names = args.commands
+        updates = [
+            (name, make_update(bot, i, rnd.randint(1, args.users), COMMANDS[name]))
+            for i, name in enumerate(rnd.choices(names, k=args.updates), 1)
+        ]
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in updates:
+            queue.put_nowait(item)
+
+        latencies: dict[str, list[float]] = defaultdict(list)
+        errors: Counter[str] = Counter()
+
+        async def worker():
+            while not queue.empty():
+                name, update = queue.get_nowait()
+                start = perf_counter()
+                try:
+                    await dp.feed_update(bot, update)
+                except Exception as e:
+                    errors[type(e).__name__] += 1
+                latencies[name].append(perf_counter() - start)
+
+        start = perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        duration = perf_counter() - start
+    finally:
+        await db.close()
+        await Parser.close_session()
+        if mock is not None:
+            mock.terminate()
+            await mock.wait()
+
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'users': args.users,
+            'concurrency': args.concurrency,
+            'size': args.size,
+            'latency': args.latency,
+            'jitter': args.jitter,
+            'error_rate': args.error_rate,
+        },
+        'updates': args.updates,
+        'duration_s': duration,
+        'throughput_rps': args.updates / duration,
+        'latency': summary([value for values in latencies.values() for value in values]),
+        'commands': {name: summary(values) for name, values in latencies.items()},
+        'errors': dict(errors),
+        'bot_api_calls': dict(session.calls),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000, help='simulated users')
+    parser.add_argument('--updates', type=int, default=10000, help='updates to feed')
+    parser.add_argument('--concurrency', type=int, default=100, help='updates handled at once')
+    parser.add_argument(
+        '--commands', nargs='+', choices=tuple(COMMANDS), default=list(COMMANDS), help='to send'
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mock-url', help="running mock of 'Моя школа', started if not given")
+    parser.add_argument('--size', choices=('small', 'typical', 'huge'), default='typical')
+    parser.add_argument('--latency', type=float, default=0, help='delay of the mock, s')
+    parser.add_argument('--jitter', type=float, default=0, help='random extra delay, s')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of failed responses')
+    parser.add_argument('--log-level', default='WARNING', help='log level of the bot')
+    parser.add_argument('--output', type=Path, help='file for the JSON report')
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    print(
+        f'{report["updates"]} updates in {report["duration_s"]:.2f} s, '
+        f'{report["throughput_rps"]:.1f} updates/s'
+    )
+    for name, stats in {'all': report['latency'], **report['commands']}.items():
+        print(
+            f'{name:>10}: p50 {stats["p50_ms"]:.1f} ms, p95 {stats["p95_ms"]:.1f} ms, '
+            f'p99 {stats["p99_ms"]:.1f} ms, max {stats["max_ms"]:.1f} ms'
+        )
+    if report['errors']:
+        print('Errors:', report['errors'])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
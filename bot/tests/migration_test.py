@@ -0,0 +1,141 @@
+import sqlite3
+import unittest
+from contextlib import closing
+
+from bot.tests.database_case import DatabaseTestCase
+from database import UserModel
+
+# Schema of the first release: no indexes, no cache tables and the user required a token
+BASELINE_SCHEMA = """
+CREATE TABLE homework_week (
+    id INTEGER NOT NULL,
+    "begin" VARCHAR NOT NULL,
+    "end" VARCHAR NOT NULL,
+    timestamp VARCHAR NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE TABLE users (
+    userid INTEGER NOT NULL,
+    username VARCHAR NOT NULL,
+    debug BOOLEAN DEFAULT 'FALSE' NOT NULL,
+    setting_dw BOOLEAN DEFAULT 'FALSE' NOT NULL,
+    setting_notification BOOLEAN DEFAULT 'FALSE' NOT NULL,
+    setting_hide_link BOOLEAN DEFAULT 'FALSE' NOT NULL,
+    token VARCHAR NOT NULL,
+    student_id INTEGER NOT NULL,
+    homework_id INTEGER,
+    PRIMARY KEY (userid),
+    FOREIGN KEY(homework_id) REFERENCES homework_week (id)
+);
+CREATE TABLE study_days (
+    id INTEGER NOT NULL,
+    homework_id INTEGER NOT NULL,
+    name VARCHAR NOT NULL,
+    date VARCHAR NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(homework_id) REFERENCES homework_week (id) ON DELETE CASCADE
+);
+CREATE TABLE lessons (
+    id INTEGER NOT NULL,
+    study_day_id INTEGER NOT NULL,
+    name VARCHAR NOT NULL,
+    homework VARCHAR,
+    links VARCHAR,
+    PRIMARY KEY (id),
+    FOREIGN KEY(study_day_id) REFERENCES study_days (id) ON DELETE CASCADE
+);
+INSERT INTO homework_week VALUES (1, '2025-01-13', '2025-01-17', '2025-01-13 08:00:00');
+INSERT INTO study_days VALUES (1, 1, 'Понедельник', '2025-01-13');
+INSERT INTO lessons VALUES (1, 1, 'Math', 'p. 1', '[]');
+INSERT INTO users VALUES (1, 'user1', 0, 1, 1, 0, 'token', 5, 1);
+"""
+
+
+class MigrationTest(DatabaseTestCase):
+    initial_schema = BASELINE_SCHEMA
+
+    def schema(self) -> dict[str, list[tuple]]:
+        with closing(sqlite3.connect(self.path)) as conn:
+            tables = [
+                row[0]
+                for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            ]
+            return {
+                name: conn.execute(f'PRAGMA table_info({name})').fetchall()
+                + conn.execute(f'PRAGMA index_list({name})').fetchall()
+                for name in tables
+            }
+
+    def columns(self, table: str) -> dict[str, tuple]:
+        with closing(sqlite3.connect(self.path)) as conn:
+            return {row[1]: row for row in conn.execute(f'PRAGMA table_info({table})')}
+
+    def indexes(self, table: str) -> set[str]:
+        with closing(sqlite3.connect(self.path)) as conn:
+            return {row[1] for row in conn.execute(f'PRAGMA index_list({table})')}
+
+    async def test_users_are_kept(self):
+        user = await self.db.get_user(1)
+        assert isinstance(user, UserModel)
+        self.assertEqual((user.username, user.token, user.student_id), ('user1', 'token', 5))
+        self.assertTrue(user.setting_dw)
+        self.assertIsNone(user.person_id)
+        # The weeks have been recreated, the users refer to none of them
+        self.assertIsNone(user.homework_id)
+
+    async def test_columns_are_brought_to_the_models(self):
+        users = self.columns('users')
+        self.assertIn('person_id', users)
+        # NOT NULL has been dropped, a user without a token can be stored
+        self.assertEqual(users['token'][3], 0)
+        await self.db.add_user(UserModel(userid=2, username='user2'))
+        await self.writes.flush()
+        self.assertIsInstance(await self.db.get_user(2), UserModel)
+
+        weeks = self.columns('homework_week')
+        self.assertEqual(weeks['begin'][2], 'DATE')
+        self.assertIn('content_hash', weeks)
+
+    async def test_missing_tables_and_indexes_are_created(self):
+        self.assertIn('ix_users_homework_id', self.indexes('users'))
+        self.assertIn('ix_homework_week_expires_at', self.indexes('homework_week'))
+        self.assertIn('fetched_at', self.columns('response_cache'))
+        self.assertIn('expires_at', self.columns('fsm_state'))
+
+    async def test_second_run_changes_nothing(self):
+        schema = self.schema()
+        await self.db.create_tables()
+        self.assertEqual(self.schema(), schema)
+        self.assertIsInstance(await self.db.get_user(1), UserModel)
+
+
+class AddColumnTest(DatabaseTestCase):
+    # Users of a release without `person_id`, the other columns are as in the model
+    initial_schema = """
+CREATE TABLE users (
+    userid INTEGER NOT NULL,
+    username VARCHAR NOT NULL,
+    debug BOOLEAN DEFAULT 'FALSE' NOT NULL,
+    setting_dw BOOLEAN DEFAULT 'FALSE' NOT NULL,
+    setting_notification BOOLEAN DEFAULT 'FALSE' NOT NULL,
+    setting_hide_link BOOLEAN DEFAULT 'FALSE' NOT NULL,
+    token VARCHAR,
+    student_id INTEGER,
+    homework_id INTEGER,
+    PRIMARY KEY (userid)
+);
+INSERT INTO users VALUES (1, 'user1', 0, 0, 0, 0, 'token', 5, NULL);
+"""
+
+    async def test_missing_column_is_added(self):
+        with closing(sqlite3.connect(self.path)) as conn:
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(users)')]
+        # Added at the end, the table hasn't been rebuilt
+        self.assertEqual(columns[-1], 'person_id')
+        user = await self.db.get_user(1)
+        assert isinstance(user, UserModel)
+        self.assertEqual(user.token, 'token')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""Local stand-in of the "Моя школа" API for load testing.
+
+Serves the endpoints used by `Parser` with the responses of `bot/tests/fixtures`, the dates of the
+fixtures are shifted to the requested week. The bot is pointed to it by the environment:
+
+    python -m bot.tests.mock_mosreg --port 8081 --latency 0.05 --error-rate 0.01
+    AUTHEDU_URL=http://127.0.0.1:8081 MYSCHOOL_URL=http://127.0.0.1:8081 python -m bot.bin.bot
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import zlib
+from datetime import date, timedelta
+from pathlib import Path
+
+from aiohttp import web
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+SIZES = ('small', 'typical', 'huge')
+# Monday of the fixtures week
+MONDAY = date(2025, 1, 13)
+DATE = re.compile(rb'\d{4}-\d{2}-\d{2}')
+# Error responses injected by `--error-rate`, 401 makes the bot ask the user for a new token
+ERRORS = (500, 500, 400, 401)
+
+
+class MockMosreg:
+    """Handlers of the mocked endpoints with configurable latency and errors."""
+
+    def __init__(
+        self, size: str = 'typical', latency: float = 0, jitter: float = 0, error_rate: float = 0
+    ):
+        """Initializes the mock.
+
+        Args:
+            size (str): Fixtures to respond with: "small", "typical" or "huge".
+            latency (float): Delay of every response in seconds.
+            jitter (float): Random part of the delay in seconds, added to `latency`.
+            error_rate (float): Share of the responses that fail with an error status.
+        """
+        self.size = size
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._weeks: dict[tuple[str, date], bytes] = {}
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        self.requests += 1
+        if delay := self.latency + random.uniform(0, self.jitter):
+            await asyncio.sleep(delay)
+        if random.random() < self.error_rate:
+            self.errors += 1
+            return web.Response(status=random.choice(ERRORS), text='Injected error')
+        return await handler(request)
+
+    def week(self, name: str, monday: date) -> bytes:
+        """Returns the fixture with its dates shifted from the fixture week to the given one."""
+        if (body := self._weeks.get((name, monday))) is None:
+            shift = monday - MONDAY
+            body = DATE.sub(
+                lambda m: (date.fromisoformat(m[0].decode()) + shift).isoformat().encode(),
+                (FIXTURES / f'{name}_{self.size}.json').read_bytes(),
+            )
+            self._weeks[name, monday] = body
+        return body
+
+    def weeks(self, name: str, start: str, end: str) -> bytes:
+        """Joins the `payload` of every week from `start` to `end`."""
+        first, last = date.fromisoformat(start), date.fromisoformat(end)
+        first -= timedelta(days=first.weekday())
+        parts = []
+        while first <= last:
+            # Strips '{"payload": [' and ']}' of the fixture
+            body = self.week(name, first).strip()
+            parts.append(body[body.index(b'[') + 1 : body.rindex(b']')].strip())
+            first += timedelta(weeks=1)
+        return b'{"payload":[%s]}' % b','.join(part for part in parts if part)
+
+    async def homeworks(self, request: web.Request) -> web.Response:
+        query = request.query
+        return self.json(self.weeks('homeworks', query['from'], query['to']))
+
+    async def marks(self, request: web.Request) -> web.Response:
+        query = request.query
+        return self.json(self.weeks('marks', query['from'], query['to']))
+
+    async def events(self, request: web.Request) -> web.Response:
+        begin = date.fromisoformat(request.query['begin_date'])
+        return self.json(self.week('events', begin - timedelta(days=begin.weekday())))
+
+    async def sessions(self, request: web.Request) -> web.Response:
+        token = (await request.json())['auth_token']
+        return web.json_response({'person_id': f'person-{token}'})
+
+    async def profile_info(self, request: web.Request) -> web.Response:
+        token = request.headers.get('Auth-Token', '')
+        return web.json_response([{'id': zlib.crc32(token.encode())}])
+
+    @staticmethod
+    def json(body: bytes) -> web.Response:
+        return web.Response(body=body, content_type='application/json')
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.middleware])
+        app.add_routes(
+            [
+                web.get('/api/family/web/v1/homeworks', self.homeworks),
+                web.get('/api/family/web/v1/marks', self.marks),
+                web.get('/api/eventcalendar/v1/api/events', self.events),
+                web.post('/api/ej/acl/v1/sessions', self.sessions),
+                web.get('/acl/api/users/profile_info', self.profile_info),
+            ]
+        )
+        return app
+
+
+async def start(mock: MockMosreg, host: str = '127.0.0.1', port: int = 8081) -> web.AppRunner:
+    """Starts the mock in the running loop, it's stopped by `runner.cleanup()`."""
+    runner = web.AppRunner(mock.make_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--size', choices=SIZES, default='typical', help='fixtures to serve')
+    parser.add_argument('--latency', type=float, default=0, help='delay of a response, s')
+    parser.add_argument('--jitter', type=float, default=0, help='random extra delay, s')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of failed responses')
+    args = parser.parse_args()
+
+    mock = MockMosreg(args.size, args.latency, args.jitter, args.error_rate)
+    web.run_app(mock.make_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == '__main__':
+    main()
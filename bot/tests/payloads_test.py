@@ -0,0 +1,48 @@
+import json
+import unittest
+from datetime import date
+
+from bot.classes.payloads import split_by_week
+
+FIRST, SECOND = date(2025, 1, 13), date(2025, 1, 20)
+
+
+def response(*dates: str) -> bytes:
+    return json.dumps(
+        {'payload': [{'date': day, 'subject_name': f'Subject {day}'} for day in dates]}
+    ).encode()
+
+
+def dates(part: bytes) -> list[str]:
+    return [item['date'] for item in json.loads(part)['payload']]
+
+
+class SplitByWeekTest(unittest.TestCase):
+    def test_items_are_split_by_their_week(self):
+        parts = split_by_week(
+            response('2025-01-13', '2025-01-17', '2025-01-20T08:30:00', '2025-01-24'),
+            [FIRST, SECOND],
+        )
+        self.assertEqual(dates(parts[FIRST]), ['2025-01-13', '2025-01-17'])
+        self.assertEqual(dates(parts[SECOND]), ['2025-01-20T08:30:00', '2025-01-24'])
+
+    def test_items_are_copied_as_they_are(self):
+        item = {'date': '2025-01-14', 'homework': 'Задача «1»', 'additional_materials': []}
+        parts = split_by_week(json.dumps({'payload': [item]}).encode(), [FIRST])
+        self.assertEqual(json.loads(parts[FIRST]), {'payload': [item]})
+
+    def test_week_without_items_is_empty(self):
+        parts = split_by_week(response('2025-01-13'), [FIRST, SECOND])
+        self.assertEqual(dates(parts[SECOND]), [])
+
+    def test_items_of_other_weeks_are_skipped(self):
+        parts = split_by_week(response('2025-01-06', '2025-01-13', '2025-01-27'), [FIRST])
+        self.assertEqual(list(parts), [FIRST])
+        self.assertEqual(dates(parts[FIRST]), ['2025-01-13'])
+
+    def test_empty_payload(self):
+        self.assertEqual(dates(split_by_week(b'{"payload": null}', [FIRST])[FIRST]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import patch
+
+from bot.classes.renderer import Renderer
+from bot.tests.homework_test import make_week
+
+
+class RendererCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.renderer = Renderer(maxsize=2)
+        patcher = patch.object(
+            Renderer, '_render_homework_day', side_effect=Renderer._render_homework_day
+        )
+        self.render = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_same_content_is_rendered_once(self):
+        text = self.renderer.homework(make_week((0, 'Math', 'p. 1')), False, False, 0)
+        # Another object with the same content shares the texts
+        again = self.renderer.homework(make_week((0, 'Math', 'p. 1')), False, False, 0)
+        self.assertEqual(again, text)
+        self.assertIn('p. 1', text)
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_variants_are_rendered_separately(self):
+        week = make_week((0, 'Math', 'p. 1'), (1, 'Physics', 'p. 5'))
+        monday = self.renderer.homework(week, False, False, 0)
+        tuesday = self.renderer.homework(week, False, False, 1)
+        self.assertNotEqual(monday, tuesday)
+        # The whole week is made of the cached days
+        self.assertIn(tuesday, self.renderer.homework(week, True, False, 0))
+        self.assertEqual(self.render.call_count, len(week.days))
+
+    def test_changed_content_gets_new_text(self):
+        self.renderer.homework(make_week((0, 'Math', 'p. 1')), False, False, 0)
+        text = self.renderer.homework(make_week((0, 'Math', 'p. 2')), False, False, 0)
+        self.assertIn('p. 2', text)
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_discarded_content_is_rendered_again(self):
+        week = make_week((0, 'Math', 'p. 1'))
+        self.renderer.homework(week, False, False, 0)
+        self.renderer.discard(week.content_hash)
+        self.renderer.homework(week, False, False, 0)
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_least_recently_used_content_is_evicted(self):
+        weeks = [make_week((0, 'Math', f'p. {i}')) for i in range(3)]
+        for week in weeks:
+            self.renderer.homework(week, False, False, 0)
+        self.renderer.homework(weeks[2], False, False, 0)
+        self.assertEqual(self.render.call_count, 3)
+        self.renderer.homework(weeks[0], False, False, 0)
+        self.assertEqual(self.render.call_count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
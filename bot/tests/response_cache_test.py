@@ -0,0 +1,63 @@
+import unittest
+from datetime import date, datetime
+
+from bot.classes import ResponseCache
+from bot.tests.database_case import DatabaseTestCase
+from bot.until import UnavailableError
+
+MONDAY = date(2025, 1, 13)
+
+
+class Week:
+    def __init__(self, response: bytes, timestamp: datetime):
+        self.response = response
+        self.timestamp = timestamp
+        self.stale = False
+
+
+class ResponseCacheTest(DatabaseTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.cache = ResponseCache(db=self.db)
+        self.fetched = 0
+
+    async def fetch(self) -> bytes:
+        self.fetched += 1
+        return b'{"payload": []}'
+
+    async def unavailable(self) -> bytes:
+        raise UnavailableError
+
+    async def get(self, fetch) -> Week:
+        return await self.cache.get_or_fetch(1, MONDAY, 'homework', fetch, Week)
+
+    async def test_response_is_fetched_once(self):
+        first = await self.get(self.fetch)
+        self.assertIs(await self.get(self.fetch), first)
+        self.assertEqual(self.fetched, 1)
+
+    async def test_rebuilt_response_keeps_its_fetch_time(self):
+        first = await self.get(self.fetch)
+        # The object is rebuilt from the database
+        self.cache.memory.clear()
+        rebuilt = await self.get(self.fetch)
+        self.assertIsNot(rebuilt, first)
+        self.assertEqual(rebuilt.timestamp, first.timestamp)
+        self.assertEqual(self.fetched, 1)
+
+    async def test_expired_response_is_served_while_unavailable(self):
+        self.cache.ttl['homework'] = -1
+        await self.get(self.fetch)
+
+        week = await self.get(self.unavailable)
+        self.assertTrue(week.stale)
+        self.assertEqual(week.response, b'{"payload": []}')
+        self.assertEqual(self.cache.stale_hits, 1)
+
+    async def test_unavailable_without_a_cached_response_raises(self):
+        with self.assertRaises(UnavailableError):
+            await self.get(self.unavailable)
+
+
+if __name__ == '__main__':
+    unittest.main()
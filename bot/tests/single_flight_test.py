@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+
+from bot.until import SingleFlight
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.flight = SingleFlight()
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def call(self) -> int:
+        self.calls += 1
+        await self.release.wait()
+        return self.calls
+
+    async def test_concurrent_calls_are_coalesced(self):
+        waiters = [asyncio.create_task(self.flight.do('key', self.call)) for _ in range(5)]
+        await asyncio.sleep(0)
+        self.release.set()
+        self.assertEqual(await asyncio.gather(*waiters), [1] * 5)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.flight.coalesced, 4)
+        self.assertEqual(len(self.flight), 0)
+
+    async def test_calls_with_other_keys_arent_coalesced(self):
+        waiters = [asyncio.create_task(self.flight.do(key, self.call)) for key in 'ab']
+        await asyncio.sleep(0)
+        self.release.set()
+        await asyncio.gather(*waiters)
+        self.assertEqual(self.calls, 2)
+
+    async def test_exception_reaches_every_waiter(self):
+        async def fail():
+            await self.release.wait()
+            raise ValueError
+
+        waiters = [asyncio.create_task(self.flight.do('key', fail)) for _ in range(3)]
+        await asyncio.sleep(0)
+        self.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    async def test_cancelled_waiter_doesnt_cancel_the_call(self):
+        first = asyncio.create_task(self.flight.do('key', self.call))
+        second = asyncio.create_task(self.flight.do('key', self.call))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        self.release.set()
+        self.assertEqual(await second, 1)
+        self.assertTrue(first.cancelled())
+
+    async def test_call_is_cancelled_without_waiters(self):
+        waiter = asyncio.create_task(self.flight.do('key', self.call))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.sleep(0)
+        self.assertEqual(len(self.flight), 0)
+        # The next call starts again
+        self.release.set()
+        self.assertEqual(await self.flight.do('key', self.call), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+from datetime import datetime
+
+from aiogram import Bot
+from aiogram.types import Chat, Message, Update, User
+
+from bot.bin.supervisor import Supervisor, UserLocks, shard_key
+
+
+def make_update(update_id: int, user_id: int | None = None, chat_id: int = 1) -> Update:
+    user = User(id=user_id, is_bot=False, first_name='user') if user_id is not None else None
+    message = Message(
+        message_id=update_id,
+        date=datetime(2025, 1, 13),
+        chat=Chat(id=chat_id, type='private' if user else 'channel'),
+        from_user=user,
+        text='/start',
+    )
+    return Update(update_id=update_id, message=message)
+
+
+class ShardKeyTest(unittest.TestCase):
+    def test_update_is_routed_by_its_user(self):
+        self.assertEqual(shard_key(make_update(1, user_id=5, chat_id=7)), 5)
+
+    def test_update_without_a_user_is_routed_by_its_chat(self):
+        self.assertEqual(shard_key(make_update(1, chat_id=7)), 7)
+
+    def test_update_without_a_user_and_a_chat_is_routed_to_the_first_worker(self):
+        self.assertEqual(shard_key(Update(update_id=1)), 0)
+
+
+class SupervisorRoutingTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # The workers aren't started, the queues are read by the test
+        self.supervisor = Supervisor(workers=3, queue_size=10)
+        for queue in self.supervisor._queues:
+            self.addCleanup(queue.join_thread)
+            self.addCleanup(queue.close)
+        self.bot = Bot('1:test')
+        self.addAsyncCleanup(self.bot.session.close)
+
+    def received(self, index: int, count: int) -> list[Update]:
+        queue = self.supervisor._queues[index]
+        items = [queue.get(timeout=5) for _ in range(count)]
+        return [Update.model_validate_json(raw) for _, raw in items]
+
+    async def test_updates_of_a_user_go_to_the_same_worker_in_order(self):
+        for update_id, user_id in enumerate([4, 2, 4, 3, 4], start=1):
+            await self.supervisor.feed_update(self.bot, make_update(update_id, user_id=user_id))
+        self.assertEqual(self.supervisor.routed, [1, 3, 1])
+
+        updates = self.received(1, 3)
+        self.assertEqual([update.update_id for update in updates], [1, 3, 5])
+        self.assertEqual(updates[0].message and updates[0].message.text, '/start')
+        self.assertEqual([update.update_id for update in self.received(2, 1)], [2])
+        self.assertEqual([update.update_id for update in self.received(0, 1)], [4])
+
+
+class UserLocksTest(unittest.IsolatedAsyncioTestCase):
+    async def test_updates_of_a_user_are_handled_one_at_a_time(self):
+        locks = UserLocks()
+        order = []
+
+        async def handle(key: int, name: str, delay: float):
+            async with locks.hold(key):
+                order.append(f'{name} start')
+                await asyncio.sleep(delay)
+                order.append(f'{name} end')
+
+        await asyncio.gather(handle(1, 'a', 0.02), handle(1, 'b', 0), handle(2, 'c', 0.01))
+        self.assertEqual(order, ['a start', 'c start', 'c end', 'a end', 'b start', 'b end'])
+        # Locks nobody holds or waits for aren't kept
+        self.assertEqual(len(locks), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import patch
+
+from bot.until import TTLCache
+
+
+class TTLCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        patcher = patch('bot.until.ttl_cache.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_entry_expires_after_its_ttl(self):
+        cache = TTLCache(10, ttl=5)
+        cache.set('default', 1)
+        cache.set('own', 2, ttl=20)
+        self.now = 10
+        self.assertIsNone(cache.get('default'))
+        self.assertEqual(cache.get('own'), 2)
+        self.assertNotIn('default', cache)
+        self.assertEqual(len(cache), 1)
+
+    def test_entry_without_ttl_never_expires(self):
+        cache = TTLCache(10)
+        cache.set('key', 1)
+        self.now = 10**9
+        self.assertEqual(cache.get('key'), 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_hits_and_misses_are_counted(self):
+        cache = TTLCache(10)
+        cache.set('key', 1)
+        cache.get('key')
+        cache.get('other')
+        # A membership check isn't a lookup of the caller
+        self.assertIn('key', cache)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import asyncio
+import unittest
+from contextlib import asynccontextmanager, nullcontext
+from typing import Any, cast
+from unittest.mock import AsyncMock, patch
+
+from bot.tests.database_case import DatabaseTestCase
+from database import UserModel
+from database.write_queue import WriteBehindQueue
+
+
+class MemoryQueue(WriteBehindQueue[int, str]):
+    """Writes the changes to a dict, the write fails while `broken` is set."""
+
+    def __init__(self):
+        # The session is a stub, the changes never reach a database
+        super().__init__(cast(Any, lambda: nullcontext(AsyncMock())), delay=3600)
+        self.rows: dict[int, str] = {}
+        self.broken = False
+        self.failures = 0
+
+    def put(self, key: int, value: str):
+        self._put(key, value)
+
+    async def _write(self, session: Any, pending: dict[int, str]):
+        if self.broken:
+            self.failures += 1
+            raise ConnectionError
+        self.rows.update(pending)
+
+
+class WriteBehindQueueTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.queue = MemoryQueue()
+        self.addAsyncCleanup(self.queue.close)
+
+    async def test_changes_are_written_by_one_flush(self):
+        self.queue.put(1, 'a')
+        self.queue.put(2, 'b')
+        self.queue.put(1, 'c')
+        await self.queue.flush()
+        self.assertEqual(self.queue.rows, {1: 'c', 2: 'b'})
+        self.assertEqual((len(self.queue), self.queue.written), (0, 2))
+
+    async def test_failed_flush_is_requeued(self):
+        self.queue.put(1, 'old')
+        self.queue.put(2, 'old')
+        self.queue.broken = True
+        with self.assertRaises(ConnectionError):
+            await self.queue.flush()
+        self.assertEqual(len(self.queue), 2)
+
+        # A change made after the failure wins over the requeued one
+        self.queue.put(1, 'new')
+        self.queue.broken = False
+        await self.queue.flush()
+        self.assertEqual(self.queue.rows, {1: 'new', 2: 'old'})
+
+    async def test_failed_flush_is_retried(self):
+        self.queue.delay = 0.01
+        self.queue.broken = True
+        self.queue.put(1, 'a')
+        while not self.queue.failures:
+            await asyncio.sleep(0.01)
+
+        # No other change comes, the retry writes the requeued one
+        self.queue.broken = False
+        async with asyncio.timeout(1):
+            while not self.queue.rows:
+                await asyncio.sleep(0.01)
+        self.assertEqual(self.queue.rows, {1: 'a'})
+
+
+class UserWriteQueueTest(DatabaseTestCase):
+    async def get_user(self, userid: int) -> UserModel | None:
+        async with self.session_maker() as session:
+            return await session.get(UserModel, userid)
+
+    async def test_changes_of_a_user_are_merged(self):
+        self.writes.put({'userid': 1, 'username': 'user1', 'setting_dw': True}, insert=True)
+        self.writes.put({'userid': 1, 'token': 'token'})
+        self.assertEqual(len(self.writes), 1)
+        self.assertEqual(self.writes.merged, 1)
+
+        await self.writes.flush()
+        user = await self.get_user(1)
+        assert user is not None
+        self.assertTrue(user.setting_dw)
+        self.assertEqual(user.token, 'token')
+        self.assertEqual(self.writes.written, 1)
+
+    async def test_deleted_user_is_not_written_back(self):
+        self.writes.put({'userid': 1, 'username': 'user1'}, insert=True)
+        await self.writes.flush()
+
+        self.writes.put({'userid': 1, 'token': 'token'})
+        await self.db.delete_user(1)
+        await self.writes.flush()
+        self.assertNotIn(1, self.writes)
+        self.assertIsNone(await self.get_user(1))
+
+    async def test_update_changes_only_the_named_columns(self):
+        await self.db.add_user(UserModel(userid=1, username='user1', setting_dw=True))
+        await self.writes.flush()
+
+        await self.db.update_user(UserModel(userid=1, username='user1', token='token'), ('token',))
+        await self.writes.flush()
+        user = await self.get_user(1)
+        assert user is not None
+        self.assertEqual((user.token, user.setting_dw), ('token', True))
+
+    async def test_update_after_deletion_doesnt_add_the_user(self):
+        await self.db.add_user(UserModel(userid=1, username='user1'))
+        await self.writes.flush()
+        await self.db.delete_user(1)
+
+        await self.db.update_user(UserModel(userid=1, username='user1', token='token'), ('token',))
+        await self.writes.flush()
+        self.assertIsNone(await self.get_user(1))
+
+    async def test_user_deleted_during_flush_is_not_written_back(self):
+        self.writes.put({'userid': 1, 'username': 'user1'}, insert=True)
+        await self.writes.flush()
+        started, resumed = asyncio.Event(), asyncio.Event()
+
+        @asynccontextmanager
+        async def slow_session_maker():
+            started.set()
+            await resumed.wait()
+            async with self.session_maker() as session:
+                yield session
+
+        # An insert, an update of a deleted user matches nothing anyway
+        self.writes.put({'userid': 1, 'username': 'user1', 'token': 'token'}, insert=True)
+        with patch.object(self.writes, 'session_maker', slow_session_maker):
+            flush = asyncio.create_task(self.writes.flush())
+            await started.wait()
+            delete = asyncio.ensure_future(self.db.delete_user(1))
+            await asyncio.sleep(0.1)
+            resumed.set()
+            await asyncio.gather(flush, delete)
+        self.assertIsNone(await self.get_user(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
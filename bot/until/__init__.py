@@ -8,13 +8,29 @@ __all__ = (
     'ExpiredTokenError',
     'NoTokenError',
     'ServerError',
+    'UnavailableError',
     # Functions
     'get_weekday',
+    # Classes
+    'BackgroundTask',
+    'CircuitBreaker',
+    'Metrics',
+    'SingleFlight',
+    'TTLCache',
+    'Tracer',
     # Other
     'logger',
+    'metrics',
+    'tracer',
 )
 
+from .background_task import BackgroundTask
+from .circuit_breaker import CircuitBreaker
 from .exceptions import *
 from .get_weekday import get_weekday
 from .keyboard import *
 from .logger import logger
+from .metrics import Metrics, metrics
+from .single_flight import SingleFlight
+from .tracing import Tracer, tracer
+from .ttl_cache import TTLCache
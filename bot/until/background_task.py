@@ -0,0 +1,25 @@
+import asyncio
+from typing import Any, Callable, Coroutine, Optional
+
+
+class BackgroundTask:
+    """The task of a service running in the background.
+
+    It's started at most once and is cancelled on stop, so a service can be started and stopped
+    again and its `stop` is safe to call even if it hasn't been started.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, run: Callable[..., Coroutine[Any, Any, Any]], *args: Any):
+        """Runs `run(*args)` as the task if it isn't running yet."""
+        if self._task is None:
+            self._task = asyncio.create_task(run(*args))
+
+    async def stop(self):
+        """Cancels the task and waits until it's finished."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
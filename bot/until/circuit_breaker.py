@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+from time import monotonic
+from typing import Iterator, Literal
+
+from .exceptions import UnavailableError
+
+State = Literal['closed', 'open', 'half_open']
+
+
+class CircuitBreaker:
+    """Fails fast while a server is down instead of waiting for its timeouts.
+
+    After `threshold` failures in a row the breaker opens and every call is rejected with
+    `UnavailableError` at once. `reset_timeout` seconds later one call is let through as a probe:
+    its success closes the breaker, its failure opens it again for another `reset_timeout`.
+    Only `UnavailableError` of the call is a failure, any other answer of the server (e.g. an
+    expired token) proves that the server is up.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        """Initializes the breaker.
+
+        Args:
+            threshold (int): Number of failures in a row which opens the breaker.
+            reset_timeout (float): Seconds the breaker stays open before a probe.
+        """
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+
+        self.state: State = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+        self.opens = 0
+        self.rejected = 0
+
+    def before(self):
+        """Lets the call through or raises `UnavailableError` if the breaker is open."""
+        if self.state == 'open' and monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = 'half_open'
+        if self.state == 'half_open' and not self._probing:
+            self._probing = True
+            return
+        if self.state != 'closed':
+            self.rejected += 1
+            raise UnavailableError
+
+    def success(self):
+        self.state = 'closed'
+        self._failures = 0
+        self._probing = False
+
+    def failure(self):
+        self._failures += 1
+        self._probing = False
+        if self.state == 'half_open' or self._failures >= self.threshold:
+            if self.state != 'open':
+                self.opens += 1
+            self.state = 'open'
+            self._opened_at = monotonic()
+
+    def release(self):
+        """Ends a call which has neither succeeded nor failed, e.g. a cancelled one."""
+        self._probing = False
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """Wraps a call to the server, its outcome is recorded by the breaker."""
+        self.before()
+        try:
+            yield
+        except UnavailableError:
+            self.failure()
+            raise
+        except Exception:
+            # The server has answered
+            self.success()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        else:
+            self.success()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            'open': int(self.state != 'closed'),
+            'failures': self._failures,
+            'opens': self.opens,
+            'rejected': self.rejected,
+        }
@@ -19,3 +19,8 @@ class ServerError(Exception):
         self, message='Произошла ошибка при получении информации. Повторите попытку позже.'
     ):
         super().__init__(message)
+
+
+class UnavailableError(ServerError):
+    def __init__(self, message='Сервер «Моя школа» сейчас недоступен. Повторите попытку позже.'):
+        super().__init__(message)
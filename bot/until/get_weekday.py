@@ -1,3 +1,14 @@
+from typing import overload
+
+
+@overload
+def get_weekday(number: int) -> str: ...
+
+
+@overload
+def get_weekday(number: None = None) -> list[str]: ...
+
+
 def get_weekday(number: int | None = None) -> str | list[str]:
     weekdays = {
         1: 'Понедельник',
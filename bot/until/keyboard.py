@@ -6,6 +6,8 @@ __all__ = (
     'username_button',
 )
 
+from typing import TYPE_CHECKING
+
 from aiogram.types import (
     InlineKeyboardButton,
     InlineKeyboardMarkup,
@@ -13,10 +15,11 @@ from aiogram.types import (
     ReplyKeyboardMarkup,
 )
 
-from bot.classes import UserClass
+if TYPE_CHECKING:
+    from bot.classes import UserClass
 
 
-def main_button(user: UserClass) -> ReplyKeyboardMarkup:
+def main_button(user: 'UserClass') -> ReplyKeyboardMarkup:
     buttons = [
         [
             KeyboardButton(text='Расписание 📅'),
@@ -33,7 +36,7 @@ def main_button(user: UserClass) -> ReplyKeyboardMarkup:
     return markup
 
 
-def make_setting_button(user: UserClass) -> ReplyKeyboardMarkup:
+def make_setting_button(user: 'UserClass') -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
         resize_keyboard=True,
         keyboard=[
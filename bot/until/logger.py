@@ -18,4 +18,4 @@ logger.add(
     level='DEBUG' if config.DEBUG else 'INFO',
     colorize=True,
 )
-logger.add(format=log_format, sink='temp/log.log', level='INFO', mode='w')
+logger.add(format=log_format, sink=config.LOG_FILE, level='INFO', mode='w')
@@ -0,0 +1,228 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+from typing import Any, Awaitable, Callable, ClassVar, Iterator, ParamSpec, TypeVar
+
+P = ParamSpec('P')
+R = TypeVar('R')
+
+# Upper bounds of the latency buckets in seconds
+BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{%s}' % ','.join(pairs) if pairs else ''
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+class Metric:
+    """Metric with labels, the values are kept by the tuple of the label values."""
+
+    kind: ClassVar[str] = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple, Any] = {}
+
+    def samples(self) -> Iterator[str]:
+        for values, value in self._values.items():
+            yield f'{self.name}{_labels(self.labels, values)} {value}'
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels: Any, value: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + value
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        collect: Callable[[], dict[tuple, float]] | None = None,
+    ):
+        """Initializes the gauge.
+
+        Args:
+            name (str): Name of the metric.
+            documentation (str): Description of the metric.
+            labels (tuple[str, ...]): Names of the labels.
+            collect (Callable, optional): Returns the values by the label values, it's called on
+                every scrape instead of keeping the values.
+        """
+        super().__init__(name, documentation, labels)
+        self.collect = collect
+
+    def inc(self, *labels: Any, value: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + value
+
+    def dec(self, *labels: Any, value: float = 1):
+        self._values[labels] = self._values.get(labels, 0) - value
+
+    def set(self, value: float, *labels: Any):
+        self._values[labels] = value
+
+    def samples(self) -> Iterator[str]:
+        if self.collect is not None:
+            self._values = self.collect()
+        return super().samples()
+
+
+class _Buckets:
+    __slots__ = ('counts', 'sum')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels: Any):
+        if (data := self._values.get(labels)) is None:
+            # The last count is of the values above all the buckets (+Inf)
+            data = self._values[labels] = _Buckets(len(self.buckets) + 1)
+        data.counts[bisect_left(self.buckets, value)] += 1
+        data.sum += value
+
+    @contextmanager
+    def time(self, *labels: Any) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, *labels)
+
+    def samples(self) -> Iterator[str]:
+        for values, data in self._values.items():
+            total = 0
+            for bound, count in zip((*self.buckets, '+Inf'), data.counts):
+                total += count
+                le = _labels(self.labels, values, f'le="{bound}"')
+                yield f'{self.name}_bucket{le} {total}'
+            yield f'{self.name}_sum{_labels(self.labels, values)} {data.sum}'
+            yield f'{self.name}_count{_labels(self.labels, values)} {total}'
+
+
+class Metrics:
+    """Registry of the metrics of the bot rendered in the Prometheus text format.
+
+    Every operation is tracked by a latency histogram, a counter of errors by the exception type
+    and a gauge of the operations in flight: handlers by their name, requests to "Моя школа" by
+    the endpoint and `DataBaseCrud` methods by their name.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+        self.handler_duration = self.add(
+            Histogram('bot_handler_duration_seconds', 'Time of handling a message.', ('handler',))
+        )
+        self.handler_errors = self.add(
+            Counter('bot_handler_errors_total', 'Failed handlers.', ('handler', 'exception'))
+        )
+        self.handlers_in_flight = self.add(
+            Gauge('bot_handlers_in_flight', 'Messages being handled.', ('handler',))
+        )
+
+        self.upstream_duration = self.add(
+            Histogram(
+                'bot_upstream_request_duration_seconds',
+                'Time of a request to "Моя школа".',
+                ('endpoint',),
+            )
+        )
+        self.upstream_errors = self.add(
+            Counter(
+                'bot_upstream_errors_total',
+                'Failed requests to "Моя школа".',
+                ('endpoint', 'exception'),
+            )
+        )
+        self.upstream_retries = self.add(
+            Counter('bot_upstream_retries_total', 'Retried requests to "Моя школа".', ('endpoint',))
+        )
+        self.upstream_in_flight = self.add(
+            Gauge('bot_upstream_requests_in_flight', 'Requests to "Моя школа".', ('endpoint',))
+        )
+
+        self.db_duration = self.add(
+            Histogram('bot_db_duration_seconds', 'Time of a database method.', ('method',))
+        )
+        self.db_errors = self.add(
+            Counter('bot_db_errors_total', 'Failed database methods.', ('method', 'exception'))
+        )
+        self.db_in_flight = self.add(
+            Gauge('bot_db_in_flight', 'Database methods being run.', ('method',))
+        )
+
+    def add(self, metric: Metric) -> Any:
+        """Registers the metric and returns it."""
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self._metrics[metric.name] = metric
+        return metric
+
+    @contextmanager
+    def track(
+        self, duration: Histogram, errors: Counter, in_flight: Gauge, *labels: Any
+    ) -> Iterator[None]:
+        """Tracks the time, the error and the flight of the operation in the `with` block."""
+        in_flight.inc(*labels)
+        start = perf_counter()
+        try:
+            yield
+        except Exception as e:
+            errors.inc(*labels, type(e).__name__)
+            raise
+        finally:
+            duration.observe(perf_counter() - start, *labels)
+            in_flight.dec(*labels)
+
+    def track_db(self, func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+        """Decorator of a `DataBaseCrud` coroutine method, it's tracked by its name."""
+        name = func.__name__
+
+        @wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with self.track(self.db_duration, self.db_errors, self.db_in_flight, name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    def render(self) -> str:
+        """Returns all the metrics in the Prometheus text exposition format (version 0.0.4)."""
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+metrics = Metrics()
@@ -0,0 +1,62 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class _Call:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one.
+
+    While a call with some key is in flight, every other call with the same key awaits its result
+    (or its exception) instead of starting a new one. A caller that is cancelled doesn't cancel
+    the call for the others, the call is cancelled only when nobody waits for it anymore.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Runs `func` or joins the call with the same key which is already in flight.
+
+        Args:
+            key (Hashable): Identity of the call.
+            func (Callable): Coroutine function making the call.
+
+        Returns:
+            The result of the call.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.ensure_future(func()))
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {'in_flight': len(self._calls), 'calls': self.calls, 'coalesced': self.coalesced}
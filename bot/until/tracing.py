@@ -0,0 +1,164 @@
+import json
+import os
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from itertools import count
+from time import perf_counter, time
+from typing import IO, Any, Awaitable, Callable, Iterator, Optional, ParamSpec, TypeVar
+from uuid import uuid4
+
+from bot.config import config
+
+P = ParamSpec('P')
+R = TypeVar('R')
+
+
+class Trace:
+    __slots__ = ('trace_id', 'number', 'spans')
+
+    def __init__(self, number: int):
+        self.trace_id = uuid4().hex
+        # Thread of the trace in the viewer, so concurrent traces don't overlap
+        self.number = number
+        self.spans: list[Span] = []
+
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'attrs', 'start', 'duration')
+
+    def __init__(
+        self, trace: Trace, span_id: int, parent_id: Optional[int], name: str, attrs: dict
+    ):
+        self.trace = trace
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.start = perf_counter()
+        self.duration = 0.0
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+
+class Tracer:
+    """Span-based tracing of updates, a trace is written when its root span ends.
+
+    The current span is kept in a context variable, so the spans opened by the middlewares, the
+    handler, `Parser` and `DataBaseCrud` nest by themselves, also in the tasks started inside a
+    span. Outside a sampled trace the spans cost one lookup of the context variable.
+
+    The traces are appended to a file in the Chrome trace event format, it's opened by
+    chrome://tracing or https://ui.perfetto.dev.
+    """
+
+    def __init__(
+        self, sample_rate: float = config.TRACE_SAMPLE_RATE, path: str = config.TRACE_FILE
+    ):
+        """Initializes the tracer.
+
+        Args:
+            sample_rate (float): Share of the traces which are recorded, from 0 to 1.
+            path (str): File the traces are appended to.
+        """
+        self.sample_rate = sample_rate
+        self.path = path
+
+        self._file: Optional[IO[str]] = None
+        self._numbers = count(1)
+        self._span_ids = count(1)
+
+        self.written = 0
+
+    @contextmanager
+    def trace(self, name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+        """Opens the root span of a new trace if it's sampled, yields None otherwise."""
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            yield None
+            return
+
+        trace = Trace(next(self._numbers))
+        try:
+            with self._span(trace, None, name, attrs) as span:
+                yield span
+        finally:
+            self._write(trace)
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+        """Opens a child of the current span, yields None if there is no trace."""
+        if (parent := _current_span.get()) is None:
+            yield None
+            return
+        with self._span(parent.trace, parent.span_id, name, attrs) as span:
+            yield span
+
+    def traced(self, func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+        """Decorator of a coroutine function, every call is a span named by the function."""
+        name = func.__qualname__
+
+        @wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if _current_span.get() is None:
+                return await func(*args, **kwargs)
+            with self.span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    @contextmanager
+    def _span(
+        self, trace: Trace, parent_id: Optional[int], name: str, attrs: dict
+    ) -> Iterator[Span]:
+        span = Span(trace, next(self._span_ids), parent_id, name, attrs)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs['error'] = type(e).__name__
+            raise
+        finally:
+            span.duration = perf_counter() - span.start
+            _current_span.reset(token)
+            trace.spans.append(span)
+
+    def _write(self, trace: Trace):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+            # The closing bracket is optional in the format, so the file is only appended to
+            if self._file.tell() == 0:
+                self._file.write('[\n')
+
+        pid = os.getpid()
+        for span in trace.spans:
+            event = {
+                'name': span.name,
+                'cat': 'bot',
+                'ph': 'X',
+                'ts': span.start * 1e6,
+                'dur': span.duration * 1e6,
+                'pid': pid,
+                'tid': trace.number,
+                'args': {
+                    'trace_id': trace.trace_id,
+                    'span_id': span.span_id,
+                    'parent_id': span.parent_id,
+                    **span.attrs,
+                },
+            }
+            if span.parent_id is None:
+                event['args']['wall_time'] = time() - span.duration
+            self._file.write(json.dumps(event, ensure_ascii=False, default=str) + ',\n')
+        self._file.flush()
+        self.written += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+tracer = Tracer()
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """LRU cache with a size bound, every entry also expires after its own time to live."""
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        """Initializes the cache.
+
+        Args:
+            maxsize (int): Maximum number of entries, the least recently used one is evicted first.
+            ttl (float, optional): Default time to live in seconds. None means entries never expire.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Optional[float], Any]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _missing, count=False) is not _missing
+
+    def get(self, key: Hashable, default: Any = None, *, count: bool = True) -> Any:
+        item = self._data.get(key)
+        if item is not None:
+            expires_at, value = item
+            if expires_at is None or expires_at > monotonic():
+                self._data.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+            del self._data[key]
+        if count:
+            self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (None if ttl is None else monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        self._data.clear()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+_missing = object()
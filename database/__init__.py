@@ -1,11 +1,18 @@
 __all__ = (
     'DataBaseCrud',
+    'SQLiteStorage',
+    'UserWriteQueue',
+    'fsm_storage',
     # models
     'UserModel',
     'HomeworkWeekModel',
     'LessonModel',
     'StudyDayModel',
+    'ResponseCacheModel',
+    'FSMStateModel',
 )
 
 from .crud import DataBaseCrud
+from .fsm_storage import SQLiteStorage, fsm_storage
 from .models import *
+from .write_queue import UserWriteQueue
@@ -1,38 +1,57 @@
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import date, datetime, timedelta
+from typing import Optional, cast
 
-from sqlalchemy import select, update
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy import CursorResult, delete, func, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from bot.until import logger
+from bot.config import config
+from bot.until import logger, metrics, tracer
 
 from .database import *
+from .migration import migrate
 from .models import *
+from .write_queue import UserWriteQueue, user_writes
 
 
 class DataBaseCrud:
     """Interface to the database."""
 
-    def __init__(self, engine=engine, session_maker=sm):
+    def __init__(self, engine=engine, session_maker=sm, writes: UserWriteQueue = user_writes):
         self.engine = engine
         self.session_maker = session_maker
+        self.writes = writes
 
     async def __call__(self, userid: Optional[int] = None) -> None | UserModel | list[UserModel]:
         return await self.get_user(userid)
 
     async def create_tables(self):
+        """Creates the missing tables, the existing ones are migrated to the models first."""
         async with self.engine.begin() as conn:
+            await conn.run_sync(migrate)
             await conn.run_sync(Base.metadata.create_all)
 
+    async def close(self):
+        """Writes everything what is pending, must be called on shutdown."""
+        await self.writes.close()
+
     # Users
+    @metrics.track_db
+    @tracer.traced
     async def add_user(self, user: UserModel):
-        """Adds a user to the database if the user isn't there."""
-        async with self.session_maker() as session:
-            if not (await session.execute(select(UserModel).filter_by(userid=user.userid))).first():
-                session.add(user)
-                await session.commit()
-                logger.debug(f'User {user.username} has been added to the database!')
+        """Adds a user to the database, the user is written by the write-behind queue."""
+        self.writes.put(
+            {
+                column.key: getattr(user, column.key)
+                for column in UserModel.__table__.columns
+                if column.key != 'homework_id'
+            },
+            insert=True,
+        )
 
+    @metrics.track_db
+    @tracer.traced
     async def get_user(self, userid: Optional[int] = None) -> None | UserModel | list[UserModel]:
         """Returns a user from the database if username, else returns all users.
 
@@ -43,74 +62,378 @@ class DataBaseCrud:
             user by userid as UserModel if userid,
             else all users in the database as list[UserModel].
         """
+        # Read own writes
+        if (userid in self.writes) if userid else len(self.writes) > 0:
+            await self.writes.flush()
+
         async with self.session_maker() as session:
             if userid:
                 return await session.scalar(select(UserModel).filter_by(userid=userid))
             else:
                 return list((await session.execute(select(UserModel))).scalars().all())
 
+    @metrics.track_db
+    @tracer.traced
+    async def get_users(self, shard: Optional[tuple[int, int]] = None) -> list[UserModel]:
+        """Returns all users in the database.
+
+        Args:
+            shard: `(index, workers)` of a worker, only the users it handles (`userid % workers ==
+                index`) are returned. None returns all users
+        """
+        if len(self.writes) > 0:
+            await self.writes.flush()
+
+        query = select(UserModel)
+        if shard is not None:
+            index, workers = shard
+            query = query.filter(UserModel.userid % workers == index)
+        async with self.session_maker() as session:
+            return list(await session.scalars(query))
+
+    @metrics.track_db
+    @tracer.traced
     async def update_user(self, user: UserModel, changes: Optional[tuple[str, ...]] = None):
         """Updates a user in the database.
 
+        The changes are merged with other pending changes of the user and written by the
+        write-behind queue. A user who isn't in the database (e.g. has been deleted) isn't added.
+        `homework_id` is managed by `add_homework` and is updated only if it's named in `changes`.
+
         Args:
             user: User for update
             changes: Name of fields to be updated
         """
-        async with self.session_maker() as session:
-            if not changes:
-                changes_dict = {
-                    attr: getattr(user, attr)
-                    for attr in user.__dict__
-                    if attr in UserModel.__table__.columns
-                }
-            else:
-                changes_dict = {attr: getattr(user, attr) for attr in changes}
-            await session.execute(
-                update(UserModel).filter_by(userid=user.userid).values(**changes_dict)
-            )
-            await session.commit()
+        if not changes:
+            changes_dict = {
+                attr: getattr(user, attr)
+                for attr in user.__dict__
+                if attr in UserModel.__table__.columns and attr != 'homework_id'
+            }
+        else:
+            changes_dict = {attr: getattr(user, attr) for attr in changes}
+        self.writes.put({'userid': user.userid} | changes_dict)
 
+    @metrics.track_db
+    @tracer.traced
     async def delete_user(self, userid: int):
         """Deletes a user from the database. Also deletes a user's homework if no one else refers to it."""
-        async with self.session_maker() as session:
-            try:
-                query = select(UserModel).filter_by(userid=userid)
-                user = (await session.execute(query)).scalar_one()
-                homework = user.homework
-                await session.delete(user)
-                if not homework.users:
-                    await session.delete(homework)
-                await session.commit()
-            except NoResultFound:
+        async with self.writes.paused(), self.session_maker() as session:
+            self.writes.discard(userid)
+            user = await session.get(UserModel, userid)
+            if user is None:
                 logger.warning(f'User with ID {userid} does not exist in the database!')
-                await session.rollback()
+                return
+
+            homework_id = user.homework_id
+            await session.delete(user)
+            await session.flush()
+            await self._release_homework(session, homework_id)
+            await session.commit()
 
     # Homework
-    async def add_homework(self, userid: int, homework: HomeworkWeekModel):
+    @metrics.track_db
+    @tracer.traced
+    async def add_homework(
+        self, userid: int, homework: HomeworkWeekModel
+    ) -> Optional[tuple[int, bool]]:
+        """Links a homework week to the user.
+
+        Weeks are content-addressed: if a week with the same content hash is already stored, it's
+        reused instead of the new one. Users who shared the user's previous copy of this week are
+        classmates, so they are moved to the new content as well and don't have to fetch it again.
+        Users who shared an empty week aren't, only the user is moved then.
+
+        Args:
+            userid: ID of the user who fetched the homework
+            homework: Freshly fetched week with its study days and lessons
+
+        Returns:
+            ID of the stored week and whether its content is new, None if there is no such user.
+        """
+        if userid in self.writes:
+            await self.writes.flush()
+
         async with self.session_maker() as session:
-            try:
-                user = await session.get(UserModel, userid)
-                if not user:
-                    raise NoResultFound
+            user = await session.get(UserModel, userid)
+            if not user:
+                logger.warning(f'User with ID {userid} does not exist in the database!')
+                return None
+
+            find_week = select(HomeworkWeekModel.id).filter_by(content_hash=homework.content_hash)
+            week_id = await session.scalar(find_week)
+            created = False
+            if week_id is None:
+                week_id = await self._insert_homework(session, homework)
+                created = week_id is not None
+                if week_id is None:
+                    # A classmate has stored the same week meanwhile
+                    week_id = (await session.execute(find_week)).scalar_one()
+            if not created:
+                # A week built from an older cached response mustn't set the timestamp back
+                await session.execute(
+                    update(HomeworkWeekModel)
+                    .filter_by(id=week_id)
+                    .filter(HomeworkWeekModel.timestamp < homework.timestamp)
+                    .values(timestamp=homework.timestamp, expires_at=homework.expires_at)
+                )
 
-                logger.debug(f'{homework.begin}, {homework.end}, {homework.timestamp}')
-                user.homework = homework
+            old_id = user.homework_id
+            if old_id == week_id:
                 await session.commit()
-            except NoResultFound:
-                logger.warning(f'User with ID {userid} does not exist in the database!')
-                await session.rollback()
+                return week_id, created
+
+            old_begin = old_id and await session.scalar(
+                select(HomeworkWeekModel.begin).filter_by(id=old_id)
+            )
+            # An empty week (e.g. holidays) is the same for many classes and schools, so only the
+            # users who shared a week with lessons are classmates
+            old_has_lessons = old_id and await session.scalar(
+                select(LessonModel.id)
+                .join(StudyDayModel)
+                .filter(StudyDayModel.homework_id == old_id)
+                .limit(1)
+            )
+            if (
+                old_begin == homework.begin
+                and old_has_lessons
+                and any(d.lessons for d in homework.study_days)
+            ):
+                await session.execute(
+                    update(UserModel).filter_by(homework_id=old_id).values(homework_id=week_id)
+                )
+            else:
+                user.homework_id = week_id
+            await session.flush()
+            await self._release_homework(session, old_id)
 
-    async def get_homework(self, userid: int) -> HomeworkWeekModel | None:
+            logger.debug(f'{homework.begin}, {homework.end}, {homework.timestamp}')
+            await session.commit()
+            return week_id, created
+
+    @staticmethod
+    async def _insert_homework(session: AsyncSession, homework: HomeworkWeekModel) -> Optional[int]:
+        """Inserts the week with its days and lessons, the days and lessons by one executemany each.
+
+        Returns:
+            ID of the inserted week, None if a week with the same content hash is already stored
+        """
+        week_id = await session.scalar(
+            insert(HomeworkWeekModel)
+            .values(
+                begin=homework.begin,
+                end=homework.end,
+                timestamp=homework.timestamp,
+                expires_at=homework.expires_at,
+                content_hash=homework.content_hash,
+            )
+            .on_conflict_do_nothing(index_elements=['content_hash'])
+            .returning(HomeworkWeekModel.id)
+        )
+        if week_id is None or not homework.study_days:
+            return week_id
+
+        await session.execute(
+            insert(StudyDayModel),
+            [
+                {'homework_id': week_id, 'name': day.name, 'date': day.date}
+                for day in homework.study_days
+            ],
+        )
+        # RETURNING would make SQLite insert the rows one by one to keep their order
+        day_ids = await session.scalars(
+            select(StudyDayModel.id).filter_by(homework_id=week_id).order_by(StudyDayModel.id)
+        )
+        lessons = [
+            {
+                'study_day_id': day_id,
+                'name': lesson.name,
+                'homework': lesson.homework,
+                'links': lesson.links,
+            }
+            for day_id, day in zip(day_ids.all(), homework.study_days)
+            for lesson in day.lessons
+        ]
+        if lessons:
+            await session.execute(insert(LessonModel), lessons)
+        return week_id
+
+    @metrics.track_db
+    @tracer.traced
+    async def get_homework(
+        self, userid: int, max_age: Optional[timedelta] = timedelta(hours=1)
+    ) -> HomeworkWeekModel | None:
+        """Returns the user's homework week with its days and lessons.
+
+        The week, its days and lessons are loaded by one query with joins.
+
+        Args:
+            userid: ID of the user
+            max_age: The week is returned only if it's younger, None returns the week of any age
+        """
         async with self.session_maker() as session:
-            try:
-                query = select(UserModel).filter_by(userid=userid)
-                user = (await session.execute(query)).one()
-                if (datetime.now() - user.homework.timestamp) < timedelta(hours=1):
-                    return user.homework
-                else:
-                    await session.delete(user.homework)
-                    return None
-            except NoResultFound:
+            week = (
+                (
+                    await session.scalars(
+                        select(HomeworkWeekModel)
+                        .join(UserModel)
+                        .filter(UserModel.userid == userid)
+                        .options(
+                            joinedload(HomeworkWeekModel.study_days).joinedload(
+                                StudyDayModel.lessons
+                            )
+                        )
+                    )
+                )
+                .unique()
+                .one_or_none()
+            )
+            if week is None:
                 logger.warning(f"User with ID {userid} doesn't have homework!")
-                await session.rollback()
                 return None
+            if max_age is None or datetime.now() - week.timestamp < max_age:
+                return week
+            return None
+
+    @metrics.track_db
+    @tracer.traced
+    async def get_homework_subscribers(self, homework_id: int) -> list[UserModel]:
+        """Returns users who have the homework week and have notifications turned on."""
+        async with self.session_maker() as session:
+            query = select(UserModel).filter_by(homework_id=homework_id, setting_notification=True)
+            return list((await session.scalars(query)).all())
+
+    @staticmethod
+    async def _release_homework(session: AsyncSession, homework_id: Optional[int]):
+        """Deletes the homework week if no user refers to it anymore."""
+        if homework_id is None:
+            return
+        references = await session.scalar(
+            select(func.count()).select_from(UserModel).filter_by(homework_id=homework_id)
+        )
+        if not references:
+            await DataBaseCrud._delete_homework(session, [homework_id])
+
+    @staticmethod
+    async def _delete_homework(session: AsyncSession, homework_ids: list[int]):
+        """Deletes the weeks with their days and lessons, the rows are found by the FK indexes."""
+        days = select(StudyDayModel.id).filter(StudyDayModel.homework_id.in_(homework_ids))
+        await session.execute(delete(LessonModel).filter(LessonModel.study_day_id.in_(days)))
+        await session.execute(
+            delete(StudyDayModel).filter(StudyDayModel.homework_id.in_(homework_ids))
+        )
+        await session.execute(
+            delete(HomeworkWeekModel).filter(HomeworkWeekModel.id.in_(homework_ids))
+        )
+
+    @metrics.track_db
+    @tracer.traced
+    async def delete_expired(self, batch_size: int) -> int:
+        """Deletes a batch of expired homework weeks, cached responses and FSM states.
+
+        Users of an expired week lose the link to it and fetch the week again when they need it.
+        An expired response is kept for `CACHE_STALE_TTL` more, it's served while the server is
+        unavailable.
+
+        Args:
+            batch_size: Maximum number of weeks, of responses and of states deleted
+
+        Returns:
+            Number of deleted rows, less than `batch_size` means nothing is left
+        """
+        now = datetime.now()
+        async with self.session_maker() as session:
+            homework_ids = list(
+                await session.scalars(
+                    select(HomeworkWeekModel.id)
+                    .filter(HomeworkWeekModel.expires_at < now)
+                    .limit(batch_size)
+                )
+            )
+            if homework_ids:
+                await session.execute(
+                    update(UserModel)
+                    .filter(UserModel.homework_id.in_(homework_ids))
+                    .values(homework_id=None)
+                )
+                await self._delete_homework(session, homework_ids)
+
+            expired_responses = (
+                select(
+                    ResponseCacheModel.student_id,
+                    ResponseCacheModel.monday,
+                    ResponseCacheModel.kind,
+                )
+                .filter(
+                    ResponseCacheModel.expires_at < now - timedelta(seconds=config.CACHE_STALE_TTL)
+                )
+                .limit(batch_size)
+            )
+            delete_responses = delete(ResponseCacheModel).filter(
+                tuple_(
+                    ResponseCacheModel.student_id,
+                    ResponseCacheModel.monday,
+                    ResponseCacheModel.kind,
+                ).in_(expired_responses)
+            )
+            # A DML statement gives a CursorResult, its row count is the number of deleted rows
+            responses = cast(CursorResult, await session.execute(delete_responses))
+            # Abandoned FSM states
+            delete_states = delete(FSMStateModel).filter(
+                FSMStateModel.key.in_(
+                    select(FSMStateModel.key)
+                    .filter(FSMStateModel.expires_at < now)
+                    .limit(batch_size)
+                )
+            )
+            states = cast(CursorResult, await session.execute(delete_states))
+            await session.commit()
+            return len(homework_ids) + responses.rowcount + states.rowcount
+
+    # Response cache
+    @metrics.track_db
+    @tracer.traced
+    async def get_cached_response(
+        self, student_id: int, monday: date, kind: str, allow_expired: bool = False
+    ) -> ResponseCacheModel | None:
+        """Returns a cached upstream response if it hasn't expired yet.
+
+        Args:
+            student_id: ID of the student
+            monday: Monday of the week
+            kind: Type of the data
+            allow_expired: Returns an expired response too, it's the stale fallback
+        """
+        query = select(ResponseCacheModel).filter(
+            ResponseCacheModel.student_id == student_id,
+            ResponseCacheModel.monday == monday,
+            ResponseCacheModel.kind == kind,
+        )
+        if not allow_expired:
+            query = query.filter(ResponseCacheModel.expires_at > datetime.now())
+        async with self.session_maker() as session:
+            return await session.scalar(query)
+
+    @metrics.track_db
+    @tracer.traced
+    async def set_cached_response(self, entry: ResponseCacheModel):
+        """Adds an upstream response to the cache or replaces the existing one.
+
+        It's an upsert, so concurrent writes of the same week don't conflict.
+        """
+        values = {
+            column.key: getattr(entry, column.key)
+            for column in ResponseCacheModel.__table__.columns
+        }
+        stmt = insert(ResponseCacheModel).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                ResponseCacheModel.student_id,
+                ResponseCacheModel.monday,
+                ResponseCacheModel.kind,
+            ],
+            set_={key: stmt.excluded[key] for key in ('payload', 'expires_at')},
+        )
+        async with self.session_maker() as session:
+            await session.execute(stmt)
+            await session.commit()
@@ -1,18 +1,51 @@
-__all__ = ('engine', 'sm', 'Base')
+__all__ = ('engine', 'sm', 'Base', 'PRAGMAS', 'make_engine')
 
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
 from bot.config import config
 
-engine = create_async_engine(
-    url=config.DB_URL,
-    echo=False,
-    # pool_size=5,
-    # max_overflow=10,
-)
+PRAGMAS = {
+    'journal_mode': config.DB_JOURNAL_MODE,
+    'synchronous': config.DB_SYNCHRONOUS,
+    'mmap_size': config.DB_MMAP_SIZE,
+    'cache_size': config.DB_CACHE_SIZE,
+    'busy_timeout': config.DB_BUSY_TIMEOUT,
+}
+
+
+def make_engine(url: str = config.DB_URL, pragmas: Optional[dict[str, Any]] = None) -> AsyncEngine:
+    """Creates the engine, the pragmas are executed on every new connection.
+
+    Args:
+        url: Database URL
+        pragmas: SQLite pragmas by name, `PRAGMAS` by default, an empty dict keeps SQLite defaults
+    """
+    pragmas = PRAGMAS if pragmas is None else pragmas
+    new_engine = create_async_engine(
+        url=url,
+        echo=False,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+    )
+
+    @event.listens_for(new_engine.sync_engine, 'connect')
+    def set_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+    return new_engine
+
+
+engine = make_engine()
 
-sm = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
+sm = async_sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 
 class Base(DeclarativeBase):
@@ -0,0 +1,165 @@
+__all__ = ('SQLiteStorage', 'fsm_storage')
+
+import json
+from datetime import datetime, timedelta
+from typing import Any, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage,
+    DefaultKeyBuilder,
+    KeyBuilder,
+    StateType,
+    StorageKey,
+)
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.config import config
+from bot.until import TTLCache
+
+from .database import sm
+from .models import FSMStateModel
+from .write_queue import WriteBehindQueue
+
+# State and data of a key
+Entry = tuple[Optional[str], dict[str, Any]]
+# Entry of a key without a state
+_EMPTY: Entry = (None, {})
+
+
+class SQLiteStorage(WriteBehindQueue[str, Entry], BaseStorage):
+    """FSM storage in the `fsm_state` table, the states survive a restart.
+
+    - The keys with a state or data are loaded once, so the state of a user who has none (almost
+      every update) is answered without a query.
+    - Read states are kept in an LRU cache.
+    - Writes are write-behind (see `WriteBehindQueue`), only the last change of a key is written.
+      A state cleared before the write costs nothing.
+    - A state expires `ttl` seconds after its last change, the expired rows are deleted by the
+      sweeper.
+
+    The processes don't share the cache, so a key must be used by one process at a time, the
+    supervisor mode routes all updates of a user to the same worker.
+    """
+
+    subject = 'FSM states'
+
+    def __init__(
+        self,
+        session_maker=sm,
+        ttl: int = config.FSM_STATE_TTL,
+        cache_size: int = config.FSM_CACHE_SIZE,
+        delay: float = config.DB_WRITE_DELAY,
+        batch_size: int = config.DB_WRITE_BATCH_SIZE,
+        key_builder: Optional[KeyBuilder] = None,
+    ):
+        """Initializes the storage.
+
+        Args:
+            session_maker: Session maker of the database.
+            ttl (int): Seconds after the last change when an abandoned state expires.
+            cache_size (int): Maximum number of states kept in memory.
+            delay (float): Seconds the changes are collected before they are written.
+            batch_size (int): Number of pending keys which are written without waiting.
+            key_builder (KeyBuilder, optional): Makes the key of a row from `StorageKey`.
+        """
+        super().__init__(session_maker, delay, batch_size)
+        self.ttl = timedelta(seconds=ttl)
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+
+        self.cache = TTLCache(cache_size)
+        self._known: Optional[set[str]] = None
+
+    # BaseStorage
+    async def set_state(self, key: StorageKey, state: StateType = None):
+        name = self.key_builder.build(key)
+        _, data = await self._get(name)
+        self._set(name, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._get(self.key_builder.build(key)))[0]
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]):
+        name = self.key_builder.build(key)
+        state, _ = await self._get(name)
+        self._set(name, state, dict(data))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return dict((await self._get(self.key_builder.build(key)))[1])
+
+    # Reads
+    async def _get(self, key: str) -> Entry:
+        if (entry := self._pending.get(key)) is not None:
+            return entry
+        if (entry := self.cache.get(key)) is not None:
+            return entry
+        if key not in await self._known_keys():
+            return _EMPTY
+
+        async with self.session_maker() as session:
+            row = await session.get(FSMStateModel, key)
+        if row is None or row.expires_at < datetime.now():
+            entry = _EMPTY
+        else:
+            entry = (row.state, json.loads(row.data))
+        self.cache.set(key, entry)
+        return entry
+
+    async def _known_keys(self) -> set[str]:
+        if self._known is None:
+            async with self._lock:
+                if self._known is None:
+                    async with self.session_maker() as session:
+                        keys = await session.scalars(
+                            select(FSMStateModel.key).filter(
+                                FSMStateModel.expires_at > datetime.now()
+                            )
+                        )
+                        known = set(keys)
+                    # The changes which aren't written yet
+                    for key, entry in self._pending.items():
+                        if entry is _EMPTY:
+                            known.discard(key)
+                        else:
+                            known.add(key)
+                    self._known = known
+        return self._known
+
+    # Writes
+    def _set(self, key: str, state: Optional[str], data: dict[str, Any]):
+        entry = (state, data) if state is not None or data else _EMPTY
+        self.cache.set(key, entry)
+        if self._known is not None:
+            if entry is _EMPTY:
+                self._known.discard(key)
+            else:
+                self._known.add(key)
+        self._put(key, entry)
+
+    async def _write(self, session: AsyncSession, pending: dict[str, Entry]):
+        """Upserts the states, the empty ones are deleted."""
+        expires_at = datetime.now() + self.ttl
+        rows = [
+            {
+                'key': key,
+                'state': state,
+                'data': json.dumps(data, ensure_ascii=False),
+                'expires_at': expires_at,
+            }
+            for key, (state, data) in pending.items()
+            if (state, data) != _EMPTY
+        ]
+        if rows:
+            statement = insert(FSMStateModel)
+            statement = statement.on_conflict_do_update(
+                index_elements=[FSMStateModel.key],
+                set_={c: statement.excluded[c] for c in ('state', 'data', 'expires_at')},
+            )
+            await session.execute(statement, rows)
+        if deleted := [key for key, entry in pending.items() if entry == _EMPTY]:
+            await session.execute(delete(FSMStateModel).filter(FSMStateModel.key.in_(deleted)))
+
+
+fsm_storage = SQLiteStorage()
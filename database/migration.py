@@ -0,0 +1,87 @@
+__all__ = ('migrate',)
+
+from sqlalchemy import Connection, Inspector, Table, inspect, text
+from sqlalchemy.schema import CreateColumn
+
+from .database import Base
+from .models import *  # the models are added to the metadata on import
+
+# Tables with the "Моя школа" data only, they are fetched again, so they are recreated instead of
+# being migrated. Children go first.
+CACHE_TABLES = ('lessons', 'study_days', 'homework_week', 'response_cache')
+# They refer to each other, so they are recreated together
+HOMEWORK_TABLES = {'lessons', 'study_days', 'homework_week'}
+
+
+def _changed_columns(inspector: Inspector, table: Table) -> bool:
+    """Whether a column of the table has another type or nullability than in the model."""
+    dialect = inspector.dialect
+    columns = {column['name']: column for column in inspector.get_columns(table.name)}
+    for column in table.columns:
+        if (existing := columns.get(column.name)) is None:
+            continue
+        if str(existing['type']) != column.type.compile(dialect=dialect):
+            return True
+        if existing['nullable'] != column.nullable and not column.primary_key:
+            return True
+    return False
+
+
+def _outdated(inspector: Inspector, table: Table) -> bool:
+    columns = {column['name'] for column in inspector.get_columns(table.name)}
+    return columns != set(table.columns.keys()) or _changed_columns(inspector, table)
+
+
+def _rebuild(conn: Connection, table: Table, columns: set[str]):
+    """Recreates the table by the model and copies its rows, the new columns get their defaults."""
+    for index in inspect(conn).get_indexes(table.name):
+        conn.execute(text(f'DROP INDEX {index["name"]}'))
+    old = f'{table.name}__old'
+    conn.execute(text(f'ALTER TABLE {table.name} RENAME TO {old}'))
+    table.create(conn)
+    quote = conn.dialect.identifier_preparer.quote
+    names = ', '.join(quote(column.name) for column in table.columns if column.name in columns)
+    conn.execute(text(f'INSERT INTO {table.name} ({names}) SELECT {names} FROM {old}'))
+    conn.execute(text(f'DROP TABLE {old}'))
+
+
+def migrate(conn: Connection):
+    """Brings the tables of an existing database to the models, it runs before `create_all`.
+
+    - A cache table whose columns differ from the model is dropped, `create_all` creates it
+      again. The users are unlinked from the dropped homework weeks first.
+    - Another table with a changed column type or nullability is rebuilt (SQLite can't alter a
+      column), its rows are kept.
+    - The columns added to a model since the table was created are added with `ALTER TABLE ...
+      ADD COLUMN`.
+    - The missing indexes are created.
+    """
+    inspector = inspect(conn)
+    existing = set(inspector.get_table_names())
+    tables = Base.metadata.tables
+
+    outdated = {
+        name for name in CACHE_TABLES if name in existing and _outdated(inspector, tables[name])
+    }
+    if outdated & HOMEWORK_TABLES:
+        outdated |= HOMEWORK_TABLES & existing
+        if 'users' in existing:
+            conn.execute(text('UPDATE users SET homework_id = NULL'))
+    for name in CACHE_TABLES:
+        if name in outdated:
+            conn.execute(text(f'DROP TABLE {name}'))
+            existing.discard(name)
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        columns = {column['name'] for column in inspector.get_columns(table.name)}
+        if _changed_columns(inspector, table):
+            _rebuild(conn, table, columns)
+            continue
+        for column in table.columns:
+            if column.name not in columns:
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {ddl}'))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
@@ -1,6 +1,15 @@
-__all__ = ('UserModel', 'LessonModel', 'StudyDayModel', 'HomeworkWeekModel')
+__all__ = (
+    'UserModel',
+    'LessonModel',
+    'StudyDayModel',
+    'HomeworkWeekModel',
+    'ResponseCacheModel',
+    'FSMStateModel',
+)
 
+from .fsm_state_model import FSMStateModel
 from .homework_week_model import HomeworkWeekModel
 from .lesson_model import LessonModel
+from .response_cache_model import ResponseCacheModel
 from .study_day_model import StudyDayModel
 from .user_model import UserModel
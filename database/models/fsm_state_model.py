@@ -0,0 +1,16 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..database import Base
+
+
+class FSMStateModel(Base):
+    __tablename__ = 'fsm_state'
+
+    key: Mapped[str] = mapped_column(primary_key=True)
+
+    state: Mapped[Optional[str]]
+    data: Mapped[str]  # JSON
+    expires_at: Mapped[datetime] = mapped_column(index=True)
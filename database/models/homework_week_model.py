@@ -1,4 +1,6 @@
 # pyright: reportUndefinedVariable=false
+from datetime import date, datetime
+
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from ..database import Base
@@ -8,11 +10,14 @@ class HomeworkWeekModel(Base):
     __tablename__ = 'homework_week'
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    begin: Mapped[str]
-    end: Mapped[str]
-    timestamp: Mapped[str]
+    begin: Mapped[date]
+    end: Mapped[date]
+    timestamp: Mapped[datetime]
+    # The week is evicted by the sweeper after this time
+    expires_at: Mapped[datetime] = mapped_column(index=True)
+    content_hash: Mapped[str] = mapped_column(unique=True)
 
     users: Mapped[list['UserModel']] = relationship(back_populates='homework')
     study_days: Mapped[list['StudyDayModel']] = relationship(
-        back_populates='homework', cascade='all, delete-orphan'
+        back_populates='homework', cascade='all, delete-orphan', order_by='StudyDayModel.id'
     )
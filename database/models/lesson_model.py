@@ -9,7 +9,9 @@ class LessonModel(Base):
     __tablename__ = 'lessons'
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    study_day_id: Mapped[int] = mapped_column(ForeignKey('study_days.id', ondelete='CASCADE'))
+    study_day_id: Mapped[int] = mapped_column(
+        ForeignKey('study_days.id', ondelete='CASCADE'), index=True
+    )
     name: Mapped[str]
     homework: Mapped[str | None]
     links: Mapped[str | None]
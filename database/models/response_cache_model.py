@@ -0,0 +1,17 @@
+from datetime import date, datetime
+
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..database import Base
+
+
+class ResponseCacheModel(Base):
+    __tablename__ = 'response_cache'
+
+    student_id: Mapped[int] = mapped_column(primary_key=True)
+    monday: Mapped[date] = mapped_column(primary_key=True)
+    kind: Mapped[str] = mapped_column(primary_key=True)
+
+    payload: Mapped[str]
+    fetched_at: Mapped[datetime]
+    expires_at: Mapped[datetime] = mapped_column(index=True)
@@ -1,4 +1,6 @@
 # pyright: reportUndefinedVariable=false
+from datetime import date
+
 from sqlalchemy import ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -9,11 +11,13 @@ class StudyDayModel(Base):
     __tablename__ = 'study_days'
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    homework_id: Mapped[int] = mapped_column(ForeignKey('homework_week.id', ondelete='CASCADE'))
+    homework_id: Mapped[int] = mapped_column(
+        ForeignKey('homework_week.id', ondelete='CASCADE'), index=True
+    )
     name: Mapped[str]
-    date: Mapped[str]
+    date: Mapped[date]
 
     homework: Mapped['HomeworkWeekModel'] = relationship(back_populates='study_days')
     lessons: Mapped[list['LessonModel']] = relationship(
-        back_populates='study_day', cascade='all, delete-orphan'
+        back_populates='study_day', cascade='all, delete-orphan', order_by='LessonModel.id'
     )
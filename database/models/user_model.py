@@ -20,8 +20,9 @@ class UserModel(Base):
     setting_notification: Mapped[d0]
     setting_hide_link: Mapped[d0]
 
-    token: Mapped[str]
-    student_id: Mapped[int]
-    homework_id: Mapped[int | None] = mapped_column(ForeignKey('homework_week.id'))
+    token: Mapped[str | None]
+    student_id: Mapped[int | None]
+    person_id: Mapped[str | None]
+    homework_id: Mapped[int | None] = mapped_column(ForeignKey('homework_week.id'), index=True)
 
     homework: Mapped['HomeworkWeekModel'] = relationship(back_populates='users')
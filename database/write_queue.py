@@ -0,0 +1,206 @@
+__all__ = ('UserWriteQueue', 'WriteBehindQueue', 'user_writes')
+
+import asyncio
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, Generic, Hashable, Optional, TypeVar, cast
+
+from sqlalchemy import Table, bindparam, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.config import config
+from bot.until import logger
+
+from .database import sm
+from .models import UserModel
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class WriteBehindQueue(ABC, Generic[K, V]):
+    """Base of the write-behind queues, the pending changes are kept by key.
+
+    All pending changes are written in one transaction `delay` seconds after the first change or
+    as soon as `batch_size` keys are pending. The changes of a failed write are requeued and retried,
+    the delay doubles with every failure up to `max_retry_delay`. A subclass adds the changes by
+    `_put` and writes them in `_write`.
+    """
+
+    # Name of the written objects in the log
+    subject = 'changes'
+
+    def __init__(
+        self,
+        session_maker=sm,
+        delay: float = config.DB_WRITE_DELAY,
+        batch_size: int = config.DB_WRITE_BATCH_SIZE,
+        max_retry_delay: float = config.DB_WRITE_MAX_RETRY_DELAY,
+    ):
+        self.session_maker = session_maker
+        self.delay = delay
+        self.batch_size = batch_size
+        self.max_retry_delay = max_retry_delay
+
+        self._pending: dict[K, V] = {}
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._flushes: set[asyncio.Task] = set()
+
+        self.written = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _put(self, key: K, value: V):
+        """Sets the pending change of the key and schedules the flush."""
+        self._pending[key] = value
+        if len(self._pending) >= self.batch_size:
+            task = asyncio.create_task(self._flush_logged(0))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        else:
+            self._schedule(self.delay)
+
+    def _schedule(self, delay: float):
+        if self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later(delay))
+
+    def _merge(self, old: V, new: V) -> V:
+        """Returns the change of a key made of a failed change and a newer one."""
+        return new
+
+    @abstractmethod
+    async def _write(self, session: AsyncSession, pending: dict[K, V]):
+        """Executes the statements writing the changes, the session is committed afterwards."""
+
+    async def flush(self):
+        """Writes all pending changes in one transaction."""
+        async with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+
+            try:
+                async with self.session_maker() as session:
+                    await self._write(session, pending)
+                    await session.commit()
+            except Exception:
+                # Newer changes made during the flush win over the failed ones
+                for key, value in pending.items():
+                    if key in self._pending:
+                        value = self._merge(value, self._pending[key])
+                    self._pending[key] = value
+                raise
+
+            self.written += len(pending)
+            logger.debug(f'{len(pending)} {self.subject} have been written to the database')
+
+    @asynccontextmanager
+    async def paused(self):
+        """Waits for the flush in progress and holds off the next ones until the block exits.
+
+        The pending change of a key is discarded and the key is deleted inside the block, so a
+        flush can't write it back.
+        """
+        async with self._lock:
+            yield
+
+    async def close(self):
+        """Cancels the timer and writes everything what is pending."""
+        # A failed flush schedules its retry, so the flushes are awaited first
+        await asyncio.gather(*self._flushes, return_exceptions=True)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+
+    async def _flush_later(self, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._timer = None
+        await self._flush_logged(delay)
+
+    async def _flush_logged(self, delay: float):
+        """Flushes the queue, a failure is logged and retried after twice the `delay`."""
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f'Writing {self.subject} to the database has failed: {e!r}')
+            self._schedule(min(max(delay, self.delay) * 2, self.max_retry_delay))
+
+
+class UserWriteQueue(WriteBehindQueue[int, tuple[bool, dict[str, Any]]]):
+    """Write-behind queue of user inserts and updates.
+
+    Changes of the same user are merged. New users are written with `INSERT ... ON CONFLICT DO
+    UPDATE`, changes of the existing ones with `UPDATE`, so a change made after the user has been
+    deleted doesn't bring the user back. Every kind of write is one executemany per set of changed
+    columns.
+    """
+
+    subject = 'users'
+
+    def __init__(
+        self,
+        session_maker=sm,
+        delay: float = config.DB_WRITE_DELAY,
+        batch_size: int = config.DB_WRITE_BATCH_SIZE,
+        max_retry_delay: float = config.DB_WRITE_MAX_RETRY_DELAY,
+    ):
+        super().__init__(session_maker, delay, batch_size, max_retry_delay)
+        self.merged = 0
+
+    def __contains__(self, userid: int) -> bool:
+        return userid in self._pending
+
+    def put(self, values: dict[str, Any], insert: bool = False):
+        """Adds the changes of a user to the queue.
+
+        Args:
+            values: Column values, `userid` is required, `username` too if the user is inserted
+            insert: Whether the user is inserted if there is no such user
+        """
+        userid = values['userid']
+        if (pending := self._pending.get(userid)) is not None:
+            insert, values = self._merge(pending, (insert, values))
+            self.merged += 1
+        self._put(userid, (insert, dict(values)))
+
+    def discard(self, userid: int):
+        """Drops the pending changes of a user, e.g. when the user is deleted."""
+        self._pending.pop(userid, None)
+
+    def _merge(
+        self, old: tuple[bool, dict[str, Any]], new: tuple[bool, dict[str, Any]]
+    ) -> tuple[bool, dict[str, Any]]:
+        return old[0] or new[0], old[1] | new[1]
+
+    async def _write(self, session: AsyncSession, pending: dict[int, tuple[bool, dict[str, Any]]]):
+        groups: defaultdict[tuple[bool, frozenset[str]], list[dict[str, Any]]] = defaultdict(list)
+        for insert, values in pending.values():
+            groups[insert, frozenset(values)].append(values)
+
+        for (insert, columns), rows in groups.items():
+            if insert:
+                statement = sqlite_insert(UserModel)
+                statement = statement.on_conflict_do_update(
+                    index_elements=[UserModel.userid],
+                    set_={c: statement.excluded[c] for c in columns if c != 'userid'},
+                )
+                await session.execute(statement, rows)
+            elif changed := columns - {'userid'}:
+                # Core UPDATE, the rows of missing users match nothing (ORM one would raise)
+                table = cast(Table, UserModel.__table__)
+                statement = (
+                    update(table)
+                    .where(table.c.userid == bindparam('user'))
+                    .values({c: bindparam(c) for c in changed})
+                )
+                await session.execute(statement, [{'user': row['userid']} | row for row in rows])
+
+
+user_writes = UserWriteQueue()